@@ -2,8 +2,10 @@ import streamlit as st
 if "results" not in st.session_state:
     st.session_state["results"] = None
 
-from simulation import run_simulation
-from visualization import show_simulation_summary, show_price_chart, show_available_supply_chart, visualize_price_with_volume, show_all_prices_chart, show_mcap
+from simulation import SimulationConfig, annualized_revenue, simulate_stream
+from result_cache import DEFAULT_CACHE_DIR, ResultCache
+from ensemble import run_ensemble
+from visualization import show_simulation_summary, show_price_chart, show_available_supply_chart, visualize_price_with_volume, show_all_prices_chart, show_mcap, show_ensemble_summary, show_ensemble_fan_chart, show_live_charts, add_live_snapshot
 from trade_interface import trade_interface
 
 logo = 'Stakesim/stakesim_logo.png'
@@ -13,8 +15,16 @@ st.image(logo)
 st.markdown("**Start sim** ⬇️")
 
 
+@st.cache_resource
+def result_cache():
+    # Shared by all sessions; the disk tier keeps results across app restarts.
+    return ResultCache(maxsize=32, cache_dir=DEFAULT_CACHE_DIR)
+
+
 if "has_run" not in st.session_state:
     st.session_state["has_run"] = False
+if "ensemble" not in st.session_state:
+    st.session_state["ensemble"] = None
 
 
 with st.sidebar:
@@ -36,16 +46,47 @@ with st.sidebar:
         expand.markdown("""Choose the probability of a user buying or selling on any given day""")
         transaction_prob = container.slider("Probability", 0.1, 1.0, 0.5)
 
+        expand = st.expander('Monte Carlo replicas', icon = '🎲')
+        expand.markdown("""Choose how many independently seeded runs the Monte Carlo tab aggregates""")
+        replicas = container.slider("Replicas", 2, 64, 16)
+
+        expand = st.expander('Random seed', icon = '🌱')
+        expand.markdown("""Runs with the same parameters and seed are identical and are shown from cache; tick the box for a fresh random seed""")
+        seed = container.number_input("Seed", min_value=0, value=0, step=1)
+        if container.checkbox("Fresh random seed"):
+            seed = None
+
+    cache_status = st.empty()
+
 if st.button("Run Simulation"):
     st.session_state["has_run"] = True
-    st.session_state["results"] = run_simulation(sim_days, users_per_day, transaction_prob)
+    config = SimulationConfig(sim_days, users_per_day, transaction_prob, seed=seed)
+    results = result_cache().get(config)
+    if results is None:
+        # Charts fill in as days complete. Any widget interaction, such as
+        # Cancel, reruns the script and abandons the run.
+        progress = st.progress(0)
+        st.button("Cancel")
+        live = st.empty()
+        stream = simulate_stream(config)
+        with live.container():
+            charts = show_live_charts(stream.engine.teams)
+        for snapshot in stream:
+            progress.progress(snapshot.day / config.sim_days)
+            add_live_snapshot(charts, snapshot)
+        live.empty()
+        results = stream.results
+        result_cache().put(results)
+    st.session_state["results"] = results
+
+cache = result_cache()
+cache_status.caption(f"Result cache: {cache.hits + cache.disk_hits} hits ({cache.disk_hits} from disk), {cache.misses} misses")
 
 if st.session_state["results"] is not None:
-    tab1, tab2, tab3 = st.tabs(["Simulation Summary", "Token Price Chart", "User Interface"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Simulation Summary", "Token Price Chart", "User Interface", "Monte Carlo"])
     with tab1:
         active_users = st.session_state['results']["active_users_30d"]
         average_30d_volume_per_user = st.session_state['results']['avg_volume_per_user_30d']
-        annualized_revenue = ((active_users*average_30d_volume_per_user)*0.0175)*12
         
         col1, col2,_ = st.columns([0.5, 0.5,1])  # 1/3 width chart
         
@@ -54,7 +95,8 @@ if st.session_state["results"] is not None:
             container.metric("Active users (at end of period)", active_users)
             container.metric("Avg volume per active user", f"${average_30d_volume_per_user:.2f}")
             container.metric("Fees collected (USD)", f"${st.session_state['results']['total_fees']:,.2f}")
-            container.metric("Annualized transaction revenue", f"${annualized_revenue:,.2f}")
+            container.metric("Annualized transaction revenue", f"${annualized_revenue(st.session_state['results']):,.2f}")
+            container.caption(f"Seed {st.session_state['results']['seed']}")
 
 
 
@@ -70,4 +112,13 @@ if st.session_state["results"] is not None:
         visualize_price_with_volume(st.session_state["results"], token_to_plot)
     with tab3:
         trade_interface(st.session_state["results"])
+    with tab4:
+        if st.button("Run Monte Carlo"):
+            progress = st.progress(0)
+            config = SimulationConfig(sim_days, users_per_day, transaction_prob)
+            st.session_state["ensemble"] = run_ensemble(config, replicas=replicas, on_progress=progress.progress)
+        if st.session_state["ensemble"] is not None:
+            show_ensemble_summary(st.session_state["ensemble"])
+            show_ensemble_fan_chart(st.session_state["ensemble"], "market_cap", "Market cap")
+            show_ensemble_fan_chart(st.session_state["ensemble"], "reserve", "Global reserve")
     
@@ -0,0 +1,291 @@
+"""Trade-loop backends: the per-user churn/sell/buy state machine for one chunk.
+
+The loop is sequential by nature (every trade moves prices before the next
+user decides), so it cannot be vectorized across users. `python` runs it
+with the ledger and pricing helpers; `numba` compiles the same state
+machine over the ledger's flat arrays when Numba is installed. Both apply
+the same operations in the same order and give identical results for a
+given seed. `auto` picks `numba` when it is available.
+"""
+import numpy as np
+
+from pricing import MIN_PRICE, PRICE_FLOOR_BAND, apply_zero_sum_price_change
+from txlog import BUY, CHURN_SELL, INSUFFICIENT_FUNDS, SELL, SUPPLY_CONSTRAINT, WHALE_CONSTRAINT
+
+try:
+    from numba import njit
+except ImportError:  # optional dependency
+    njit = None
+
+HAVE_NUMBA = njit is not None
+
+
+def trade_chunk_python(ledger, prices, token_supply, buy_volume, draws, day, chunk_start, config,
+                       tx_log, failed_tx_log, reserve_buffer, total_fees, volume_30d):
+    """Apply one chunk of a day's draws; returns the updated `(reserve_buffer, total_fees, volume_30d)`."""
+    cash = ledger.cash
+    # Users who neither churn nor trade today never enter the loop.
+    for i in np.flatnonzero(draws.churn | draws.active):
+        user_id = chunk_start + i
+        if draws.churn[i]:
+            for team_id in ledger.owned(user_id):
+                qty = ledger.clear(user_id, team_id)
+                payout = prices[team_id] * qty
+                cash[user_id] += payout
+                reserve_buffer -= payout
+                tx_log.append(day + 1, user_id, CHURN_SELL, team_id, qty, 0.0, payout)
+            continue
+
+        owned = ledger.owned(user_id)
+        if owned.size and draws.sell_side[i]:
+            team_id = owned[int(draws.sell_pick[i] * owned.size)]
+            price = prices[team_id]
+            quantity = min(ledger.get(user_id, team_id), draws.sell_quantity[i])
+            payout = price * quantity
+            cash[user_id] += payout
+            reserve_buffer -= payout
+            ledger.add(user_id, team_id, -quantity)
+            tx_log.append(day + 1, user_id, SELL, team_id, quantity, 0.0, payout)
+            apply_zero_sum_price_change(prices, token_supply, ledger.circulating, team_id, "down", quantity)
+        else:
+            team_id = draws.buy_team[i]
+            price = max(prices[team_id], MIN_PRICE)
+            quantity = max(1, int(round(10 / price)))
+            total = price * quantity
+
+            available = token_supply[team_id] - ledger.circulating[team_id]
+            holding = ledger.get(user_id, team_id)
+            max_allowed = config.max_ownership_ratio * token_supply[team_id]
+
+            if cash[user_id] >= total and available >= quantity and holding + quantity <= max_allowed:
+                fee = total * config.fee_rate
+                net = total - fee
+                cash[user_id] -= total
+                reserve_buffer += net
+                total_fees += fee
+                ledger.last_buy_day[user_id] = day + 1
+                if day + 1 > config.sim_days - 30:
+                    volume_30d += total
+                ledger.add(user_id, team_id, quantity)
+                buy_volume[team_id] += price * quantity
+                tx_log.append(day + 1, user_id, BUY, team_id, quantity, fee, total)
+                apply_zero_sum_price_change(prices, token_supply, ledger.circulating, team_id, "up", quantity)
+            else:
+                reason = (
+                    INSUFFICIENT_FUNDS if cash[user_id] < total else
+                    SUPPLY_CONSTRAINT if available < quantity else
+                    WHALE_CONSTRAINT
+                )
+                failed_tx_log.append(day + 1, user_id, BUY, team_id, quantity, reason)
+
+    return reserve_buffer, total_fees, volume_30d
+
+
+def _clamp_price(price):
+    # np.maximum(price, MIN_PRICE) semantics, NaN included.
+    return MIN_PRICE if price < MIN_PRICE else price
+
+
+def _zero_sum_kernel(prices, supply, circulating, target, up, quantity):
+    # Scalar transcription of pricing.apply_zero_sum_price_change; keep the
+    # arithmetic in the same order so both backends agree bit for bit.
+    target_supply = supply[target]
+    target_circulating = circulating[target]
+    available = max(float(target_supply - target_circulating), 1e-6)
+    scarcity_multiplier = 1 + (target_circulating / available)
+    base_delta = 0.01 * quantity
+    raw_delta_price = base_delta * scarcity_multiplier if up else -base_delta * scarcity_multiplier
+
+    old_price = prices[target]
+    proposed_price = old_price + raw_delta_price
+    compensating_effect = 0.0
+    if not up and proposed_price < 0.01:
+        softened_delta = max(0.4 * raw_delta_price, -old_price + 0.01)
+        compensating_effect = (raw_delta_price - softened_delta) * target_supply
+        delta_price = softened_delta
+    else:
+        delta_price = raw_delta_price
+
+    new_price = _clamp_price(old_price + delta_price)
+    delta_mc = (new_price - old_price) * target_supply
+    prices[target] = new_price
+
+    if abs(delta_mc) < 1e-6 and compensating_effect == 0:
+        return
+
+    total_supply_others = 0
+    eligible_count = 0
+    for t in range(prices.shape[0]):
+        if t != target and prices[t] > PRICE_FLOOR_BAND:
+            total_supply_others += supply[t]
+            eligible_count += 1
+    if eligible_count == 0:
+        return
+
+    for t in range(prices.shape[0]):
+        if t == target or not prices[t] > PRICE_FLOOR_BAND:
+            continue
+        if total_supply_others > 0:
+            share = supply[t] / total_supply_others
+        else:
+            share = 1 / eligible_count
+        adjusted = _clamp_price(prices[t] + (-delta_mc * share / supply[t]))
+        if compensating_effect > 0:
+            share = supply[t] / total_supply_others
+            adjusted = _clamp_price(adjusted + (-compensating_effect * share / supply[t]))
+        prices[t] = adjusted
+
+
+def _trade_kernel(movers, churn, sell_side, buy_team, sell_pick, sell_quantity, day, chunk_start,
+                  holdings, circulating, cash, last_buy_day, prices, supply, buy_volume,
+                  max_ownership_ratio, fee_rate, window_start, reserve_buffer, total_fees, volume_30d,
+                  tx_ints, tx_floats, failed_ints):
+    num_teams = prices.shape[0]
+    n_tx = 0
+    n_failed = 0
+    for i in movers:
+        user_id = chunk_start + i
+        if churn[i]:
+            for team_id in range(num_teams):
+                qty = holdings[user_id, team_id]
+                if qty <= 0:
+                    continue
+                holdings[user_id, team_id] = 0
+                circulating[team_id] -= qty
+                payout = prices[team_id] * qty
+                cash[user_id] += payout
+                reserve_buffer -= payout
+                tx_ints[n_tx, 0] = day + 1
+                tx_ints[n_tx, 1] = user_id
+                tx_ints[n_tx, 2] = CHURN_SELL
+                tx_ints[n_tx, 3] = team_id
+                tx_ints[n_tx, 4] = qty
+                tx_floats[n_tx, 0] = 0.0
+                tx_floats[n_tx, 1] = payout
+                n_tx += 1
+            continue
+
+        owned_count = 0
+        for team_id in range(num_teams):
+            if holdings[user_id, team_id] > 0:
+                owned_count += 1
+
+        if owned_count and sell_side[i]:
+            nth = int(sell_pick[i] * owned_count)
+            team_id = 0
+            for t in range(num_teams):
+                if holdings[user_id, t] > 0:
+                    if nth == 0:
+                        team_id = t
+                        break
+                    nth -= 1
+            price = prices[team_id]
+            quantity = min(holdings[user_id, team_id], sell_quantity[i])
+            payout = price * quantity
+            cash[user_id] += payout
+            reserve_buffer -= payout
+            holdings[user_id, team_id] -= quantity
+            circulating[team_id] -= quantity
+            tx_ints[n_tx, 0] = day + 1
+            tx_ints[n_tx, 1] = user_id
+            tx_ints[n_tx, 2] = SELL
+            tx_ints[n_tx, 3] = team_id
+            tx_ints[n_tx, 4] = quantity
+            tx_floats[n_tx, 0] = 0.0
+            tx_floats[n_tx, 1] = payout
+            n_tx += 1
+            _zero_sum_kernel(prices, supply, circulating, team_id, False, quantity)
+        else:
+            team_id = buy_team[i]
+            price = _clamp_price(prices[team_id])
+            if np.isnan(price):
+                raise ValueError("cannot convert float NaN to integer")
+            quantity = max(1, int(np.rint(10 / price)))
+            total = price * quantity
+
+            available = supply[team_id] - circulating[team_id]
+            holding = holdings[user_id, team_id]
+            max_allowed = max_ownership_ratio * supply[team_id]
+
+            if cash[user_id] >= total and available >= quantity and holding + quantity <= max_allowed:
+                fee = total * fee_rate
+                net = total - fee
+                cash[user_id] -= total
+                reserve_buffer += net
+                total_fees += fee
+                last_buy_day[user_id] = day + 1
+                if day + 1 > window_start:
+                    volume_30d += total
+                holdings[user_id, team_id] += quantity
+                circulating[team_id] += quantity
+                buy_volume[team_id] += price * quantity
+                tx_ints[n_tx, 0] = day + 1
+                tx_ints[n_tx, 1] = user_id
+                tx_ints[n_tx, 2] = BUY
+                tx_ints[n_tx, 3] = team_id
+                tx_ints[n_tx, 4] = quantity
+                tx_floats[n_tx, 0] = fee
+                tx_floats[n_tx, 1] = total
+                n_tx += 1
+                _zero_sum_kernel(prices, supply, circulating, team_id, True, quantity)
+            else:
+                if cash[user_id] < total:
+                    reason = INSUFFICIENT_FUNDS
+                elif available < quantity:
+                    reason = SUPPLY_CONSTRAINT
+                else:
+                    reason = WHALE_CONSTRAINT
+                failed_ints[n_failed, 0] = day + 1
+                failed_ints[n_failed, 1] = user_id
+                failed_ints[n_failed, 2] = BUY
+                failed_ints[n_failed, 3] = team_id
+                failed_ints[n_failed, 4] = quantity
+                failed_ints[n_failed, 5] = reason
+                n_failed += 1
+
+    return reserve_buffer, total_fees, volume_30d, n_tx, n_failed
+
+
+if HAVE_NUMBA:
+    # error_model="numpy" gives NumPy float semantics (inf/nan) for division by zero.
+    _clamp_price = njit(cache=True)(_clamp_price)
+    _zero_sum_kernel = njit(cache=True, error_model="numpy")(_zero_sum_kernel)
+    _trade_kernel = njit(cache=True, error_model="numpy")(_trade_kernel)
+
+
+def trade_chunk_numba(ledger, prices, token_supply, buy_volume, draws, day, chunk_start, config,
+                      tx_log, failed_tx_log, reserve_buffer, total_fees, volume_30d):
+    """Compiled equivalent of `trade_chunk_python`."""
+    movers = np.flatnonzero(draws.churn | draws.active)
+    trading = np.count_nonzero(draws.active & ~draws.churn)
+    churners = chunk_start + np.flatnonzero(draws.churn)
+    # Upper bound on logged rows: one per churned holding plus one per trade.
+    max_rows = np.count_nonzero(ledger.holdings[churners] > 0) + trading
+
+    tx_ints = np.empty((max_rows, 5), dtype=np.int64)
+    tx_floats = np.empty((max_rows, 2))
+    failed_ints = np.empty((trading, 6), dtype=np.int64)
+    reserve_buffer, total_fees, volume_30d, n_tx, n_failed = _trade_kernel(
+        movers, draws.churn, draws.sell_side, draws.buy_team, draws.sell_pick, draws.sell_quantity,
+        day, chunk_start, ledger.holdings, ledger.circulating, ledger.cash, ledger.last_buy_day,
+        prices, token_supply, buy_volume, float(config.max_ownership_ratio), float(config.fee_rate),
+        config.sim_days - 30, float(reserve_buffer), float(total_fees), float(volume_30d),
+        tx_ints, tx_floats, failed_ints,
+    )
+    tx_log.extend(*tx_ints[:n_tx].T, *tx_floats[:n_tx].T)
+    failed_tx_log.extend(*failed_ints[:n_failed].T)
+    return reserve_buffer, total_fees, volume_30d
+
+
+BACKENDS = {"python": trade_chunk_python, "numba": trade_chunk_numba}
+
+
+def get_backend(name="auto"):
+    """Resolve a backend name to its trade function; `auto` prefers Numba when installed."""
+    if name == "auto":
+        name = "numba" if HAVE_NUMBA else "python"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; choose from auto, {', '.join(BACKENDS)}")
+    if name == "numba" and not HAVE_NUMBA:
+        raise ValueError("The numba backend needs Numba installed; use backend='auto' to fall back to Python.")
+    return BACKENDS[name]
@@ -0,0 +1,340 @@
+"""Micro-benchmarks for the simulation engine.
+
+Run from the repository root, e.g. `python Stakesim/bench.py zero_sum`.
+Run without arguments to list the available benchmarks.
+"""
+import os
+import random
+import resource
+import sys
+import timeit
+import tracemalloc
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+
+from backends import HAVE_NUMBA
+from ensemble import run_ensemble
+from loadtest import run_load
+from market import MarketService
+from pricing import MIN_PRICE, apply_zero_sum_price_change
+from simulation import SimulationConfig, rebase_reserve, sample_day, simulate, user_days
+from txlog import ACTIONS, TX_SCHEMA, ColumnarLog
+
+NUM_TEAMS = 134
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__.removeprefix("bench_")] = func
+    return func
+
+
+def _report(label, seconds, calls, unit="call"):
+    print(f"{label:<28} {seconds / calls * 1e6:10.2f} us/{unit}")
+
+
+def _reference_zero_sum(prices, token_supply, circulating, target_team, direction, quantity):
+    # Per-element pandas implementation the vectorized kernel replaced.
+    teams = prices.index
+    available = max(token_supply[target_team] - circulating[target_team], 1e-6)
+    scarcity_multiplier = 1 + (circulating[target_team] / available)
+    base_delta = 0.01 * quantity
+    raw_delta_price = base_delta * scarcity_multiplier if direction == "up" else -base_delta * scarcity_multiplier
+
+    old_price = prices[target_team]
+    compensating_effect = 0.0
+    if direction == "down" and old_price + raw_delta_price < 0.01:
+        softened_delta = max(0.4 * raw_delta_price, -old_price + 0.01)
+        compensating_effect = (raw_delta_price - softened_delta) * token_supply[target_team]
+        delta_price = softened_delta
+    else:
+        delta_price = raw_delta_price
+
+    new_price = max(old_price + delta_price, MIN_PRICE)
+    delta_mc = (new_price - old_price) * token_supply[target_team]
+    prices[target_team] = new_price
+    if abs(delta_mc) < 1e-6 and compensating_effect == 0:
+        return prices
+
+    eligible_tokens = []
+    total_supply_others = 0
+    for t in [t for t in teams if t != target_team]:
+        if prices[t] > 0.011:
+            eligible_tokens.append(t)
+            total_supply_others += token_supply[t]
+    for t in eligible_tokens:
+        share = token_supply[t] / total_supply_others if total_supply_others > 0 else 1 / len(eligible_tokens)
+        prices[t] = max(prices[t] + -delta_mc * share / token_supply[t], MIN_PRICE)
+    if compensating_effect > 0 and eligible_tokens:
+        for t in eligible_tokens:
+            share = token_supply[t] / total_supply_others
+            prices[t] = max(prices[t] + -compensating_effect * share / token_supply[t], MIN_PRICE)
+    return prices
+
+
+def _market(rng):
+    prices = rng.choice([6.0, 1.0, 0.3, 0.05], size=NUM_TEAMS)
+    supply = np.full(NUM_TEAMS, 100, dtype=np.int64)
+    circulating = rng.integers(0, 60, size=NUM_TEAMS)
+    return prices, supply, circulating
+
+
+@benchmark
+def bench_zero_sum(calls=2000):
+    """Per-call cost of the zero-sum repricing kernel vs. the pandas loop."""
+    rng = np.random.default_rng(0)
+    prices, supply, circulating = _market(rng)
+    teams = [f"Team_{i}" for i in range(NUM_TEAMS)]
+    trades = [(int(t), "up" if up else "down", int(q))
+              for t, up, q in zip(rng.integers(0, NUM_TEAMS, calls), rng.random(calls) < 0.5, rng.integers(1, 6, calls))]
+
+    series = (pd.Series(prices.copy(), index=teams), pd.Series(supply, index=teams), pd.Series(circulating, index=teams))
+    reference = series[0]
+    start = timeit.default_timer()
+    for target, direction, quantity in trades:
+        _reference_zero_sum(reference, series[1], series[2], teams[target], direction, quantity)
+    reference_time = timeit.default_timer() - start
+
+    vectorized = prices.copy()
+    start = timeit.default_timer()
+    for target, direction, quantity in trades:
+        apply_zero_sum_price_change(vectorized, supply, circulating, target, direction, quantity)
+    kernel_time = timeit.default_timer() - start
+
+    _report("pandas per-element loop", reference_time, calls)
+    _report("numpy kernel", kernel_time, calls)
+    print(f"speedup: {reference_time / kernel_time:.1f}x, "
+          f"max abs diff: {np.abs(reference.to_numpy() - vectorized).max():.2e}")
+
+
+def _reference_rebase(token_supply, circulating, global_reserve, reserve_buffer, increment):
+    # Unit-step loop the closed-form rebase replaced.
+    while abs(reserve_buffer) >= increment:
+        if reserve_buffer > 0:
+            token_supply += 1
+            global_reserve += increment
+            reserve_buffer -= increment
+        else:
+            for team_id in range(len(token_supply)):
+                if token_supply[team_id] > circulating[team_id]:
+                    token_supply[team_id] -= 1
+            global_reserve -= increment
+            reserve_buffer += increment
+    return global_reserve, reserve_buffer
+
+
+@benchmark
+def bench_rebase(calls=100):
+    """End-of-day reserve rebase after a 13,400 LP injection and a matching drawdown."""
+    rng = np.random.default_rng(0)
+    circulating = rng.integers(0, 120, NUM_TEAMS)
+    for label, buffer in [("+13,400 injection", 13400.25), ("-13,400 drawdown", -13400.25)]:
+        timings, outcomes = {}, {}
+        for name, func in [("unit-step loop", _reference_rebase), ("closed form", rebase_reserve)]:
+            start = timeit.default_timer()
+            for _ in range(calls):
+                supply = np.full(NUM_TEAMS, 150, dtype=np.int64)
+                reserve = func(supply, circulating, 13400, buffer, 134)
+            timings[name] = timeit.default_timer() - start
+            outcomes[name] = supply, reserve
+        for name, seconds in timings.items():
+            _report(f"{label}: {name}", seconds, calls)
+        (loop_supply, loop_reserve), (closed_supply, closed_reserve) = outcomes.values()
+        print(f"supply mismatches: {np.count_nonzero(loop_supply != closed_supply)}, "
+              f"reserve/buffer match: {loop_reserve == closed_reserve}")
+
+
+@benchmark
+def bench_ensemble(replicas=16):
+    """Monte Carlo throughput (replicas/s) as the process pool widens."""
+    config = SimulationConfig(sim_days=30, users_per_day=5, transaction_prob=0.5)
+    cores = os.cpu_count() or 1
+    workers = sorted({1, 2, cores // 2, cores} - {0})
+    baseline = None
+    for n in workers:
+        start = timeit.default_timer()
+        run_ensemble(config, replicas=replicas, base_seed=0, max_workers=n)
+        rate = replicas / (timeit.default_timer() - start)
+        baseline = baseline or rate
+        print(f"{n:>3} workers {rate:10.2f} replicas/s   scaling {rate / baseline:5.2f}x")
+
+
+@benchmark
+def bench_txlog(rows=200_000):
+    """Memory per transaction and DataFrame build time: tuple list vs. columnar log."""
+    rng = np.random.default_rng(0)
+    users = [f"user_{i}" for i in range(rows // 20)]
+    teams = [f"Team_{i}" for i in range(NUM_TEAMS)]
+    user_ids = rng.integers(0, len(users), rows)
+    team_ids = rng.integers(0, NUM_TEAMS, rows)
+    actions = rng.integers(0, len(ACTIONS), rows)
+    fees = rng.random(rows)
+    columns = [name for name, _ in TX_SCHEMA]
+
+    tracemalloc.start()
+    tuples = [(i // 100 + 1, users[u], ACTIONS[a], teams[t], int(q), float(f), float(f) * 57)
+              for i, (u, a, t, q, f) in enumerate(zip(user_ids, actions, team_ids, user_ids % 7 + 1, fees))]
+    tuple_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    log = ColumnarLog(TX_SCHEMA)
+    for i, (u, a, t, q, f) in enumerate(zip(user_ids, actions, team_ids, user_ids % 7 + 1, fees)):
+        log.append(i // 100 + 1, u, a, t, q, f, f * 57)
+
+    start = timeit.default_timer()
+    for _ in range(3):  # summary stats, transaction table and volume chart each rebuilt it
+        pd.DataFrame(tuples, columns=columns)
+    tuple_time = timeit.default_timer() - start
+    start = timeit.default_timer()
+    frame = log.to_frame({"User": users, "Team": teams, "Action": ACTIONS})
+    columnar_time = timeit.default_timer() - start
+
+    print(f"tuple list      {tuple_bytes / rows:8.1f} B/tx   3 DataFrame builds {tuple_time * 1e3:8.1f} ms")
+    print(f"columnar log    {log.nbytes / rows:8.1f} B/tx   1 DataFrame build  {columnar_time * 1e3:8.1f} ms")
+    print(f"categorical DataFrame: {frame.memory_usage(deep=True).sum() / rows:.1f} B/tx")
+
+
+@benchmark
+def bench_day_draws(sizes=(1_000, 10_000, 100_000)):
+    """Per-day decision sampling: per-user scalar draws vs. one batched draw, plus a full day."""
+    weights = np.ones(NUM_TEAMS, dtype=np.int64)
+    weights[:10] = 6
+    cum_weights = np.cumsum(weights)
+    for n in sizes:
+        py_rng = random.Random(0)
+        start = timeit.default_timer()
+        for _ in range(n):
+            if py_rng.random() < 0.001:
+                continue
+            if py_rng.random() < 0.5:
+                py_rng.random()
+                py_rng.choices(range(NUM_TEAMS), cum_weights=cum_weights.tolist())
+        scalar_time = timeit.default_timer() - start
+
+        rng = np.random.default_rng(0)
+        start = timeit.default_timer()
+        sample_day(rng, n, 0.001, 0.5, cum_weights)
+        batched_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        simulate(SimulationConfig(sim_days=1, users_per_day=n, transaction_prob=0.5, seed=0))
+        day_time = timeit.default_timer() - start
+
+        print(f"{n:>8} users  scalar draws {scalar_time * 1e3:9.2f} ms  batched draws {batched_time * 1e3:7.2f} ms  "
+              f"full day {day_time * 1e3:9.1f} ms")
+
+
+@benchmark
+def bench_population(populations=(100_000, 1_000_000), sim_days=10):
+    """High-population stress run: throughput in user-days/s at 100k and 1M users."""
+    for population in populations:
+        config = SimulationConfig(
+            sim_days=sim_days,
+            users_per_day=population // sim_days,
+            transaction_prob=0.5,
+            seed=0,
+            high_population=True,
+        )
+        start = timeit.default_timer()
+        results = simulate(config)
+        elapsed = timeit.default_timer() - start
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+        print(f"{population:>9,} users  {user_days(config) / elapsed:12,.0f} user-days/s  "
+              f"{elapsed:7.1f} s  peak RSS {peak_rss / 2**10:7.1f} MiB  "
+              f"active_30d {results['active_users_30d']:,}")
+
+
+@benchmark
+def bench_history(sim_days=365):
+    """Daily price/supply/holdings history for a 365-day run: Series lists vs. preallocated arrays."""
+    rng = np.random.default_rng(0)
+    teams = pd.Index([f"Team_{i}" for i in range(NUM_TEAMS)])
+    prices = rng.random(NUM_TEAMS)
+    supply = rng.integers(100, 200, NUM_TEAMS)
+    holdings = rng.integers(0, 100, NUM_TEAMS)
+
+    tracemalloc.start()
+    start = timeit.default_timer()
+    price_history, supply_history, holdings_history = [], [], []
+    for _ in range(sim_days):
+        price_history.append(pd.Series(prices, index=teams).copy())
+        supply_history.append(pd.Series(supply, index=teams).copy())
+        holdings_history.append(pd.Series(holdings, index=teams).copy())
+    frames = [pd.DataFrame(h) for h in (price_history, supply_history, holdings_history)]
+    series_time = timeit.default_timer() - start
+    series_peak = tracemalloc.get_traced_memory()[1]
+    series_size = sum(f.memory_usage(deep=True).sum() for f in frames)
+    tracemalloc.stop()
+    del price_history, supply_history, holdings_history, frames
+
+    for every in (1, 7):
+        tracemalloc.start()
+        start = timeit.default_timer()
+        rows = len(range(0, sim_days, every))
+        price_array = np.empty((rows, NUM_TEAMS), dtype=np.float32)
+        supply_array = np.empty((rows, NUM_TEAMS), dtype=np.int32)
+        holdings_array = np.empty((rows, NUM_TEAMS), dtype=np.int32)
+        for day in range(0, sim_days, every):
+            row = day // every
+            price_array[row] = prices
+            supply_array[row] = supply
+            holdings_array[row] = holdings
+        frames = [pd.DataFrame(a, columns=teams, copy=False) for a in (price_array, supply_array, holdings_array)]
+        array_time = timeit.default_timer() - start
+        array_peak = tracemalloc.get_traced_memory()[1]
+        array_size = sum(f.memory_usage(deep=True).sum() for f in frames)
+        tracemalloc.stop()
+        label = "preallocated arrays" + (f", every {every} days" if every > 1 else "")
+        print(f"{label:<34} {array_time * 1e3:8.2f} ms  peak {array_peak / 2**10:8.1f} KiB  "
+              f"frames {array_size / 2**10:8.1f} KiB")
+    print(f"{'list of Series copies':<34} {series_time * 1e3:8.2f} ms  peak {series_peak / 2**10:8.1f} KiB  "
+          f"frames {series_size / 2**10:8.1f} KiB")
+
+
+@benchmark
+def bench_backends(sizes=((30, 5), (90, 20), (180, 50))):
+    """Trade-loop backends across sim sizes (days x users/day): pure Python vs. Numba."""
+    if not HAVE_NUMBA:
+        print("numba is not installed; only the python backend is available")
+        return
+    # Compile (or load the cached kernels) outside the timed runs.
+    simulate(SimulationConfig(sim_days=2, users_per_day=2, seed=0, backend="numba"))
+    for sim_days, users_per_day in sizes:
+        config = SimulationConfig(sim_days=sim_days, users_per_day=users_per_day, transaction_prob=0.5, seed=0)
+        timings = {}
+        for backend in ("python", "numba"):
+            start = timeit.default_timer()
+            simulate(replace(config, backend=backend))
+            timings[backend] = timeit.default_timer() - start
+        print(f"{sim_days:>4} days x {users_per_day:>3} users/day  "
+              f"python {user_days(config) / timings['python']:12,.0f} user-days/s  "
+              f"numba {user_days(config) / timings['numba']:12,.0f} user-days/s  "
+              f"speedup {timings['python'] / timings['numba']:6.1f}x")
+
+
+@benchmark
+def bench_market(clients=2000, orders=10, threads=(1, 4, 8)):
+    """Shared market service throughput and latency under concurrent clients."""
+    results = simulate(SimulationConfig(sim_days=30, users_per_day=5, seed=0))
+    for workers in threads:
+        report = run_load(MarketService.from_results(results), clients, orders, workers)
+        print(f"{workers:>2} threads  {report['orders_per_second']:10,.0f} orders/s  "
+              f"p50 {report['p50_us']:8.1f} us  p99 {report['p99_us']:10.1f} us")
+
+
+def main(argv=None):
+    names = sys.argv[1:] if argv is None else argv
+    if not names:
+        for name, func in BENCHMARKS.items():
+            print(f"{name:<16} {func.__doc__}")
+        return
+    for name in names:
+        print(f"== {name}")
+        BENCHMARKS[name]()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Monte Carlo ensembles: many independently seeded replicas of one configuration."""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from simulation import simulate, summary_metrics
+
+METRICS = [
+    "active_users_30d",
+    "avg_volume_per_user_30d",
+    "annualized_revenue",
+    "total_fees",
+    "global_reserve",
+    "final_market_cap",
+    "reserve_coverage",
+]
+PERCENTILES = [5, 25, 50, 75, 95]
+
+
+@dataclass
+class EnsembleResult:
+    config: object
+    seeds: list
+    metrics: pd.DataFrame      # one row per replica
+    summary: pd.DataFrame      # one row per metric: mean, std and percentiles
+    market_cap: pd.DataFrame   # day x replica
+    reserve: pd.DataFrame      # day x replica
+
+    def fan(self, series="market_cap", percentiles=PERCENTILES):
+        """Per-day percentiles of `market_cap` or `reserve` across replicas."""
+        paths = getattr(self, series)
+        return pd.DataFrame(
+            np.percentile(paths.to_numpy(), percentiles, axis=1).T,
+            index=paths.index,
+            columns=[f"p{p}" for p in percentiles],
+        )
+
+
+def spawn_seeds(base_seed, replicas):
+    """Derive independent, reproducible replica seeds from one base seed."""
+    children = np.random.SeedSequence(base_seed).spawn(replicas)
+    return [int(child.generate_state(1, dtype=np.uint64)[0]) for child in children]
+
+
+def run_replica(config, seed):
+    """Run one replica and keep only what the ensemble aggregates.
+
+    Returning the reduced metrics and two day-level paths instead of the
+    full results dict keeps inter-process traffic small.
+    """
+    results = simulate(replace(config, seed=seed))
+    mcap_df = results["mcap_df"]
+    metrics = summary_metrics(results, config.fee_rate)
+    return metrics, mcap_df["Market Cap"].to_numpy(), mcap_df["Global Reserve"].to_numpy()
+
+
+def summarize(metrics):
+    summary = pd.DataFrame({"mean": metrics.mean(), "std": metrics.std(ddof=1)})
+    for p in PERCENTILES:
+        summary[f"p{p}"] = metrics.quantile(p / 100)
+    return summary
+
+
+def run_ensemble(config, replicas=32, base_seed=None, max_workers=None, on_progress=None):
+    """Run `replicas` copies of `config` with independent RNG streams.
+
+    Replicas are spread over a ProcessPoolExecutor; `max_workers=1` runs
+    them in-process, which is also the fallback for a single replica.
+    """
+    seeds = spawn_seeds(base_seed, replicas)
+    max_workers = max_workers or os.cpu_count() or 1
+
+    if max_workers == 1 or replicas == 1:
+        outputs = []
+        for i, seed in enumerate(seeds):
+            outputs.append(run_replica(config, seed))
+            if on_progress is not None:
+                on_progress((i + 1) / replicas)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            outputs = []
+            chunksize = max(1, replicas // (4 * max_workers))
+            for i, output in enumerate(pool.map(run_replica, [config] * replicas, seeds, chunksize=chunksize)):
+                outputs.append(output)
+                if on_progress is not None:
+                    on_progress((i + 1) / replicas)
+
+    metrics = pd.DataFrame([m for m, _, _ in outputs], columns=METRICS)
+    days = pd.Index(np.arange(1, config.sim_days + 1), name="Day")
+    return EnsembleResult(
+        config=config,
+        seeds=seeds,
+        metrics=metrics,
+        summary=summarize(metrics),
+        market_cap=pd.DataFrame(np.column_stack([m for _, m, _ in outputs]), index=days),
+        reserve=pd.DataFrame(np.column_stack([r for _, _, r in outputs]), index=days),
+    )
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+
+def _grow(array):
+    grown = np.zeros((2 * len(array),) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class HoldingsLedger:
+    """Dense user x team token holdings backed by a preallocated NumPy matrix.
+
+    Users and teams are addressed by integer ids (row / column positions);
+    labels are only attached in `to_frame`. Rows are grown geometrically so
+    adding a user is amortized O(1), and the per-team circulating totals are
+    kept up to date on every update. Per-user cash and last buy day live in
+    flat arrays alongside the holdings, so a compiled trade loop can work on
+    the ledger without any Python objects.
+    """
+
+    def __init__(self, num_teams, capacity=64):
+        self.num_teams = num_teams
+        self.num_users = 0
+        # int32 halves the footprint at large populations; no single holding
+        # comes close to its range.
+        self._holdings = np.zeros((max(capacity, 1), num_teams), dtype=np.int32)
+        self.circulating = np.zeros(num_teams, dtype=np.int64)
+        self.cash = np.zeros(max(capacity, 1))
+        self.last_buy_day = np.zeros(max(capacity, 1), dtype=np.int32)
+
+    @classmethod
+    def from_arrays(cls, holdings, cash, last_buy_day, capacity=64):
+        """Rebuild a ledger from the per-user arrays of `num_users` users (as saved in a checkpoint)."""
+        num_users, num_teams = holdings.shape
+        ledger = cls(num_teams, capacity=max(capacity, num_users))
+        ledger._holdings[:num_users] = holdings
+        ledger.cash[:num_users] = cash
+        ledger.last_buy_day[:num_users] = last_buy_day
+        ledger.circulating[:] = holdings.sum(axis=0)
+        ledger.num_users = num_users
+        return ledger
+
+    @property
+    def holdings(self):
+        """The full holdings buffer; only the first `num_users` rows are in use."""
+        return self._holdings
+
+    def add_user(self, cash=0.0):
+        user_id = self.num_users
+        if user_id == self._holdings.shape[0]:
+            self._holdings = _grow(self._holdings)
+            self.cash = _grow(self.cash)
+            self.last_buy_day = _grow(self.last_buy_day)
+        self.cash[user_id] = cash
+        self.num_users += 1
+        return user_id
+
+    def get(self, user_id, team_id):
+        return self._holdings[user_id, team_id]
+
+    def add(self, user_id, team_id, quantity):
+        self._holdings[user_id, team_id] += quantity
+        self.circulating[team_id] += quantity
+
+    def owned(self, user_id):
+        return np.flatnonzero(self._holdings[user_id] > 0)
+
+    def clear(self, user_id, team_id):
+        quantity = self._holdings[user_id, team_id]
+        self._holdings[user_id, team_id] = 0
+        self.circulating[team_id] -= quantity
+        return quantity
+
+    def check_circulating(self):
+        """Recompute circulating totals from the full matrix and compare.
+
+        Intended for debug runs; raises RuntimeError naming the teams whose
+        incrementally maintained total has drifted.
+        """
+        expected = self._holdings[:self.num_users].sum(axis=0)
+        drifted = np.flatnonzero(expected != self.circulating)
+        if drifted.size:
+            detail = ", ".join(
+                f"team {t}: tracked {self.circulating[t]}, actual {expected[t]}" for t in drifted
+            )
+            raise RuntimeError(f"Circulating supply out of sync ({detail})")
+
+    def to_frame(self, users, teams):
+        return pd.DataFrame(
+            self._holdings[:self.num_users],
+            index=pd.Index(users, dtype=object),
+            columns=teams,
+        )
@@ -0,0 +1,131 @@
+"""Load test for the shared market service: many simulated clients trading concurrently.
+
+Usage (from the repository root):
+
+    python Stakesim/loadtest.py --clients 5000 --orders 20 --threads 8
+
+A seeded simulation provides the starting market. Each worker thread
+drives its share of the clients round-robin, every client sending a mix
+of market and limit orders around the current price, and the latency of
+every `submit` call (lock wait included) is recorded.
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np  # noqa: E402
+
+from market import FILLED, REJECTED, MarketService  # noqa: E402
+from simulation import SimulationConfig, simulate  # noqa: E402
+
+
+def _drive(market, clients, orders, limit_share, spread, seed):
+    # One worker: `orders` rounds over its clients; returns (latencies in ns, rejected count).
+    rng = np.random.default_rng(seed)
+    teams = market.teams
+    latencies = np.empty(len(clients) * orders, dtype=np.int64)
+    rejected = 0
+    n = 0
+    for _ in range(orders):
+        for user_id in clients:
+            team_id = int(rng.integers(len(teams)))
+            quantity = int(rng.integers(1, 6))
+            held = market.ledger.get(user_id, team_id)
+            side = "sell" if held >= quantity and rng.random() < 0.5 else "buy"
+            limit = None
+            if rng.random() < limit_share:
+                # Bids below and asks above the current price, so some of them rest.
+                offset = rng.uniform(-spread, spread) + (-spread if side == "buy" else spread) / 2
+                limit = max(float(market.prices[team_id]) * (1 + offset), 0.01)
+            start = time.perf_counter_ns()
+            execution = market.submit(user_id, teams[team_id], side, quantity, limit)
+            latencies[n] = time.perf_counter_ns() - start
+            rejected += execution.status == REJECTED
+            n += 1
+    return latencies, rejected
+
+
+def check_self_trades():
+    """Assert that a user's resting order is cancelled by their own order only when it would be matched."""
+    market = MarketService(["team"], [1.0], [1000], global_reserve=1000, max_ownership_ratio=1)
+    user = market.open_account(1000)
+    market.submit(user, "team", "buy", 20)
+    ask_price = 50 * float(market.prices[0])
+    market.submit(user, "team", "sell", 5, limit=ask_price)
+
+    # Filled by the protocol at the mark: the far ask is not matched and keeps resting.
+    assert market.submit(user, "team", "buy", 5).status == FILLED
+    assert market.depth("team")[1] == [(ask_price, 5)]
+    # A bid below the ask does not cross it either.
+    market.submit(user, "team", "buy", 1, limit=float(market.prices[0]) / 2)
+    assert market.depth("team")[1] == [(ask_price, 5)] and market.open_orders == 2
+
+    # Once the book beats the protocol, the crossing bid cancels the ask instead of trading with it.
+    market.prices[0] = 2 * ask_price
+    fees = market.total_fees
+    execution = market.submit(user, "team", "buy", 5, limit=ask_price)
+    assert execution.filled == 0 and market.depth("team")[1] == [] and market.total_fees == fees
+
+
+def run_load(market, clients=1000, orders=20, threads=8, cash=1000.0, limit_share=0.5, spread=0.05, seed=0):
+    """Drive `clients` new accounts with `orders` orders each from `threads` threads.
+
+    Returns a dict with the order count, wall time, throughput, latency
+    percentiles (microseconds) and the number of rejected orders.
+    """
+    accounts = [market.open_account(cash) for _ in range(clients)]
+    seeds = np.random.SeedSequence(seed).spawn(threads)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [
+            pool.submit(_drive, market, accounts[i::threads], orders, limit_share, spread, seeds[i])
+            for i in range(threads)
+        ]
+        outcomes = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+    latencies = np.concatenate([lat for lat, _ in outcomes]) / 1e3
+    return {
+        "orders": latencies.size,
+        "seconds": elapsed,
+        "orders_per_second": latencies.size / elapsed,
+        "p50_us": float(np.percentile(latencies, 50)),
+        "p99_us": float(np.percentile(latencies, 99)),
+        "rejected": sum(r for _, r in outcomes),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the shared Stakesim market service.")
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=20, help="orders per client")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--cash", type=float, default=1000.0, help="starting cash per client")
+    parser.add_argument("--limit-share", type=float, default=0.5, help="fraction of orders that are limit orders")
+    parser.add_argument("--days", type=int, default=SimulationConfig.sim_days,
+                        help="days simulated to build the starting market")
+    parser.add_argument("--users-per-day", type=int, default=SimulationConfig.users_per_day)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    check_self_trades()
+    results = simulate(SimulationConfig(args.days, args.users_per_day, seed=args.seed))
+    market = MarketService.from_results(results)
+    cap_before = float(market.prices @ market.supply)
+    report = run_load(market, args.clients, args.orders, args.threads, args.cash, args.limit_share, seed=args.seed)
+    market.ledger.check_circulating()
+
+    print(f"{report['orders']:,} orders from {args.clients:,} clients on {args.threads} threads "
+          f"in {report['seconds']:.2f} s")
+    print(f"throughput {report['orders_per_second']:,.0f} orders/s  "
+          f"latency p50 {report['p50_us']:,.1f} us  p99 {report['p99_us']:,.1f} us")
+    print(f"fills {market.fills:,}  rejected {report['rejected']:,}  resting {market.open_orders:,}  "
+          f"market cap {cap_before:,.2f} -> {float(market.prices @ market.supply):,.2f}  "
+          f"fees {market.total_fees:,.2f}")
+
+
+if __name__ == "__main__":
+    main()
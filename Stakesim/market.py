@@ -0,0 +1,327 @@
+"""Shared in-process market: many concurrent traders against one set of per-team order books.
+
+`MarketService` holds the market state of a finished simulation (prices,
+supply, circulating tokens and reserve) and accepts orders from any
+number of threads. Each team has its own limit order book matched in
+price-time priority; the protocol itself stands behind every book as a
+counterparty at the current price, issuing tokens from the unsold supply
+and buying them back from the reserve exactly as the simulated users
+trade. Those protocol fills move prices with the same scarcity and
+zero-sum rule as the simulation (`pricing.apply_zero_sum_price_change`).
+Fills between traders settle at the resting order's price and leave the
+circulating supply, and so the protocol price, unchanged; applying the
+scarcity rule to them would price the transfer of fully issued tokens
+as if the last unit had just been minted. The reserve is rebased after
+every protocol fill rather than once a day, so supply grows with the
+reserve as trading goes on.
+
+Because one fill reprices every team, all orders are applied under a
+single lock: the market is serialized, and concurrency only decides the
+order in which orders arrive.
+"""
+import heapq
+import itertools
+import threading
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from ledger import HoldingsLedger
+from pricing import MIN_PRICE, apply_zero_sum_price_change
+from simulation import FEE_RATE, INITIAL_CASH, MAX_OWNERSHIP_RATIO, RESERVE_INCREMENT, rebase_reserve
+
+SIDES = ["buy", "sell"]
+BUY, SELL = range(len(SIDES))
+
+# Execution statuses
+FILLED = "filled"
+PARTIAL = "partial"      # filled in part; a limit order rests with the rest
+RESTING = "resting"      # nothing filled; a limit order rests in full
+REJECTED = "rejected"
+
+
+class Execution(NamedTuple):
+    order_id: int
+    status: str
+    filled: int
+    average_price: float
+    resting: int
+
+
+class _RestingOrder:
+    __slots__ = ("user_id", "team_id", "side", "price", "remaining")
+
+    def __init__(self, user_id, team_id, side, price, remaining):
+        self.user_id = user_id
+        self.team_id = team_id
+        self.side = side
+        self.price = price
+        self.remaining = remaining
+
+
+class OrderBook:
+    """Bids and asks of one team as heaps of `(key, sequence, order_id)`.
+
+    Bids are keyed by negated price so both heaps pop the best price
+    first, and the sequence number breaks ties by arrival time. Cancelled
+    or filled orders are dropped lazily when they reach the top.
+    """
+
+    def __init__(self):
+        self.bids = []
+        self.asks = []
+
+    def push(self, side, price, sequence, order_id):
+        heap = self.bids if side == BUY else self.asks
+        heapq.heappush(heap, (-price if side == BUY else price, sequence, order_id))
+
+    def best(self, side, orders):
+        """The best live order on `side`, or None, discarding dead entries on the way."""
+        heap = self.bids if side == BUY else self.asks
+        while heap:
+            order = orders.get(heap[0][2])
+            if order is not None:
+                return heap[0][2], order
+            heapq.heappop(heap)
+        return None
+
+
+class MarketService:
+    """Thread-safe market over `teams` with per-team order books.
+
+    Pre-existing holdings (`circulating`) belong to a passive account 0,
+    so the circulating totals that drive repricing include them; traders
+    get their own accounts from `open_account`. Resting orders lock what
+    they could spend: cash for bids, tokens for asks. Buyers pay a fee of
+    `fee_rate` on every purchase, as in the simulation.
+    """
+
+    def __init__(self, teams, prices, supply, circulating=None, global_reserve=0.0, fee_rate=FEE_RATE,
+                 max_ownership_ratio=MAX_OWNERSHIP_RATIO, reserve_increment=RESERVE_INCREMENT):
+        self.teams = list(teams)
+        self.team_ids = {team: i for i, team in enumerate(self.teams)}
+        self.prices = np.array(prices, dtype=np.float64)
+        self.supply = np.array(supply, dtype=np.int64)
+        held = np.zeros((1, len(self.teams)), dtype=np.int32)
+        if circulating is not None:
+            held[0] = circulating
+        self.ledger = HoldingsLedger.from_arrays(held, np.zeros(1), np.zeros(1, dtype=np.int32))
+        self.global_reserve = global_reserve
+        self.reserve_buffer = 0.0
+        self.total_fees = 0.0
+        self.fee_rate = fee_rate
+        self.max_ownership_ratio = max_ownership_ratio
+        self.reserve_increment = reserve_increment
+
+        self.books = [OrderBook() for _ in self.teams]
+        self._orders = {}
+        self._locked_cash = {}     # user_id -> cash committed to resting bids
+        self._locked_tokens = {}   # (user_id, team_id) -> tokens committed to resting asks
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.fills = 0
+
+    @classmethod
+    def from_results(cls, results, **kwargs):
+        """A market starting from the final state of a simulation results dict."""
+        teams = results["final_prices"].index
+        if results["user_tokens"] is not None:
+            held = results["user_tokens"].sum()
+        else:  # high-population runs keep only the per-team totals
+            held = results["user_holdings_df"].iloc[-1]
+        return cls(
+            teams,
+            results["final_prices"].to_numpy(),
+            results["final_supply"].to_numpy(),
+            held.reindex(teams, fill_value=0).to_numpy(),
+            results["global_reserve"],
+            **kwargs,
+        )
+
+    def open_account(self, cash=INITIAL_CASH):
+        with self._lock:
+            return self.ledger.add_user(cash)
+
+    def _free_cash(self, user_id):
+        return self.ledger.cash[user_id] - self._locked_cash.get(user_id, 0.0)
+
+    def _free_tokens(self, user_id, team_id):
+        return self.ledger.get(user_id, team_id) - self._locked_tokens.get((user_id, team_id), 0)
+
+    def _room(self, user_id, team_id):
+        # Tokens `user_id` may still buy under the ownership cap.
+        return max(int(self.max_ownership_ratio * self.supply[team_id]) - int(self.ledger.get(user_id, team_id)), 0)
+
+    def _buy_limit(self, user_id, team_id, price, free_cash):
+        # Most tokens `user_id` may buy at `price`: cash and the ownership cap.
+        return max(min(int(free_cash // price), self._room(user_id, team_id)), 0)
+
+    def _settle_buy(self, user_id, team_id, quantity, price):
+        total = price * quantity
+        fee = total * self.fee_rate
+        self.ledger.cash[user_id] -= total
+        self.total_fees += fee
+        return total - fee
+
+    def _fill_from_book(self, user_id, team_id, side, quantity, order_id, resting):
+        price = resting.price
+        quantity = min(quantity, resting.remaining)
+        if side == BUY:
+            quantity = min(quantity, self._buy_limit(user_id, team_id, price, self._free_cash(user_id)))
+            if quantity == 0:
+                return 0, price
+            seller = resting.user_id
+            self._locked_tokens[(seller, team_id)] -= quantity
+            proceeds = self._settle_buy(user_id, team_id, quantity, price)
+            self.ledger.cash[seller] += proceeds
+            self.ledger.add(seller, team_id, -quantity)
+            self.ledger.add(user_id, team_id, quantity)
+        else:
+            buyer = resting.user_id
+            # The bid's own locked cash covers its remaining quantity; only the cap can shrink it.
+            quantity = min(quantity, self._room(buyer, team_id))
+            if quantity == 0:  # the bid can no longer be honored
+                self._cancel(order_id)
+                return 0, price
+            self._locked_cash[buyer] -= price * quantity
+            proceeds = self._settle_buy(buyer, team_id, quantity, price)
+            self.ledger.cash[user_id] += proceeds
+            self.ledger.add(user_id, team_id, -quantity)
+            self.ledger.add(buyer, team_id, quantity)
+        resting.remaining -= quantity
+        if resting.remaining == 0:
+            self._orders.pop(order_id)
+        return quantity, price
+
+    def _fill_from_protocol(self, user_id, team_id, side, quantity):
+        price = self.prices[team_id]
+        if side == BUY:
+            price = max(price, MIN_PRICE)
+            available = int(self.supply[team_id] - self.ledger.circulating[team_id])
+            quantity = min(quantity, available, self._buy_limit(user_id, team_id, price, self._free_cash(user_id)))
+            if quantity <= 0:
+                return 0, price
+            self.reserve_buffer += self._settle_buy(user_id, team_id, quantity, price)
+            self.ledger.add(user_id, team_id, quantity)
+        else:
+            payout = price * quantity
+            self.ledger.cash[user_id] += payout
+            self.reserve_buffer -= payout
+            self.ledger.add(user_id, team_id, -quantity)
+        apply_zero_sum_price_change(
+            self.prices, self.supply, self.ledger.circulating, team_id, "up" if side == BUY else "down", quantity
+        )
+        self.global_reserve, self.reserve_buffer = rebase_reserve(
+            self.supply, self.ledger.circulating, self.global_reserve, self.reserve_buffer, self.reserve_increment
+        )
+        return quantity, price
+
+    def submit(self, user_id, team, side, quantity, limit=None):
+        """Match one order; returns an Execution.
+
+        `side` is "buy" or "sell". A market order (`limit=None`) fills
+        what it can and drops the rest; a limit order rests with its
+        unfilled quantity. At each step the order takes the better of the
+        best opposite book order and the protocol's current price, the
+        book winning ties. Resting orders of the same user that would be
+        matched are cancelled instead.
+        """
+        team_id = self.team_ids[team]
+        side = SIDES.index(side)
+        quantity = int(quantity)
+        with self._lock:
+            order_id = next(self._ids)
+            if quantity <= 0 or (side == SELL and self._free_tokens(user_id, team_id) < quantity):
+                return Execution(order_id, REJECTED, 0, 0.0, 0)
+
+            opposite = SELL if side == BUY else BUY
+            better = (lambda a, b: a <= b) if side == BUY else (lambda a, b: a >= b)
+            remaining, cost, protocol_open = quantity, 0.0, True
+            while remaining:
+                best = self.books[team_id].best(opposite, self._orders)
+                book_ok = best is not None and (limit is None or better(best[1].price, limit))
+                mark = self.prices[team_id]
+                protocol_ok = protocol_open and (limit is None or better(mark, limit))
+                if book_ok and (not protocol_ok or better(best[1].price, mark)):
+                    if best[1].user_id == user_id:
+                        self._cancel(best[0])  # no self-trades: the incoming order replaces the resting one
+                        continue
+                    filled, price = self._fill_from_book(user_id, team_id, side, remaining, *best)
+                    if filled == 0 and side == BUY:
+                        break  # out of cash or at the ownership cap
+                elif protocol_ok:
+                    filled, price = self._fill_from_protocol(user_id, team_id, side, remaining)
+                    protocol_open = False  # the protocol fills in one lot
+                else:
+                    break
+                remaining -= filled
+                cost += filled * float(price)
+                self.fills += filled > 0
+
+            filled = quantity - remaining
+            average = cost / filled if filled else 0.0
+            resting = 0
+            if remaining and limit is not None:
+                resting = self._rest(order_id, user_id, team_id, side, limit, remaining)
+            if filled == quantity:
+                status = FILLED
+            elif filled:
+                status = PARTIAL
+            else:
+                status = RESTING if resting else REJECTED
+            return Execution(order_id, status, filled, average, resting)
+
+    def _rest(self, order_id, user_id, team_id, side, limit, quantity):
+        if side == BUY:
+            quantity = min(quantity, self._buy_limit(user_id, team_id, limit, self._free_cash(user_id)))
+            if quantity == 0:
+                return 0
+            self._locked_cash[user_id] = self._locked_cash.get(user_id, 0.0) + limit * quantity
+        else:
+            key = (user_id, team_id)
+            self._locked_tokens[key] = self._locked_tokens.get(key, 0) + quantity
+        self._orders[order_id] = _RestingOrder(user_id, team_id, side, limit, quantity)
+        self.books[team_id].push(side, limit, order_id, order_id)
+        return quantity
+
+    def _cancel(self, order_id):
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return False
+        if order.side == BUY:
+            self._locked_cash[order.user_id] -= order.price * order.remaining
+        else:
+            self._locked_tokens[(order.user_id, order.team_id)] -= order.remaining
+        return True
+
+    def cancel(self, order_id):
+        """Withdraw a resting order; returns False if it is already filled or gone."""
+        with self._lock:
+            return self._cancel(order_id)
+
+    @property
+    def open_orders(self):
+        """Number of resting orders across all books."""
+        return len(self._orders)
+
+    def snapshot(self):
+        """Current prices and circulating tokens per team, taken atomically."""
+        with self._lock:
+            return pd.DataFrame({
+                "Price": self.prices.copy(),
+                "Circulating": self.ledger.circulating.copy(),
+                "Supply": self.supply.copy(),
+            }, index=self.teams)
+
+    def depth(self, team):
+        """Live (price, quantity) levels of one team's book: `(bids, asks)`, best first."""
+        team_id = self.team_ids[team]
+        with self._lock:
+            levels = ([], [])
+            for side, heap in ((BUY, self.books[team_id].bids), (SELL, self.books[team_id].asks)):
+                for _, _, order_id in sorted(heap):
+                    order = self._orders.get(order_id)
+                    if order is not None:
+                        levels[side].append((order.price, order.remaining))
+            return levels
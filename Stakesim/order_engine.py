@@ -0,0 +1,150 @@
+"""Post-simulation trading against the final market state, without any UI dependency.
+
+`OrderEngine` holds one trader's cash and holdings, the market-wide
+holdings and the token supply as arrays indexed by team id. Orders are
+applied as events: each one is validated against the current state and
+recorded in the event log, and a filled order is folded into the state
+with only the traded team repriced. Replaying the log over the same
+results rebuilds the same state.
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from txlog import ColumnarLog
+
+STARTING_CASH = 1000.0
+SCARCITY_MULTIPLIER = 3
+EPSILON = 1e-6
+
+ORDER_SIDES = ["Buy", "Sell"]
+BUY, SELL = range(len(ORDER_SIDES))
+
+EVENT_SCHEMA = [
+    ("Side", np.int8),
+    ("Team", np.int16),
+    ("Quantity", np.int32),
+    ("Price", np.float64),
+    ("Filled", np.bool_),
+]
+
+
+class Order(NamedTuple):
+    team: str
+    side: str        # one of ORDER_SIDES
+    quantity: int
+
+
+class Fill(NamedTuple):
+    order: Order
+    ok: bool
+    price: float     # price per token the order was checked against
+    message: str
+
+
+class OrderEngine:
+    """One trader's market over the final state of a simulation `results` dict.
+
+    Prices follow the trade tab's scarcity rule: a team's raw price is its
+    first recorded price times `1 + max(0, 3 * (1 - available / held))`,
+    and all raw prices are scaled so the market cap matches the global
+    reserve. The per-team base prices, raw prices and market cap are kept
+    between orders, so an order reprices just its own team and the cap
+    by the difference. Until the first order, prices are the simulation's
+    final prices.
+    """
+
+    def __init__(self, results, cash=STARTING_CASH):
+        self.results = results
+        self.teams = list(results["final_prices"].index)
+        self.team_ids = {team: i for i, team in enumerate(self.teams)}
+        self.starting_cash = cash
+        self.cash = cash
+        self.holdings = np.zeros(len(self.teams), dtype=np.int64)
+        if results["user_tokens"] is not None:
+            held = results["user_tokens"].sum()
+        else:  # high-population runs keep only the per-team totals
+            held = results["user_holdings_df"].iloc[-1]
+        self.global_holdings = held.reindex(self.teams, fill_value=0).to_numpy(dtype=np.int64, copy=True)
+        self.supply = results["final_supply"].to_numpy(dtype=np.float64)
+        self.global_reserve = results["global_reserve"]
+
+        price_df = results["price_df"]
+        self.base = price_df.iloc[0].to_numpy(dtype=np.float64) if not price_df.empty else np.ones(len(self.teams))
+        self.raw = self.base * (1 + self._scarcity_penalty(np.arange(len(self.teams))))
+        self.cap = float(np.dot(self.raw, self.supply))
+        self._final_prices = results["final_prices"].to_numpy(dtype=np.float64)
+        self.events = ColumnarLog(EVENT_SCHEMA)
+
+    def _scarcity_penalty(self, team_ids):
+        held = self.global_holdings[team_ids]
+        available = self.supply[team_ids] - held
+        scarcity_ratio = available / (held + EPSILON)
+        return np.maximum(0, SCARCITY_MULTIPLIER * (1 - scarcity_ratio))
+
+    def price(self, team_id):
+        if not len(self.events):
+            return self._final_prices[team_id]
+        return self.raw[team_id] * self.global_reserve / self.cap if self.cap > 0 else self.raw[team_id]
+
+    @property
+    def prices(self):
+        """Current price per token of every team, as a Series."""
+        if not len(self.events):
+            values = self._final_prices.copy()
+        else:
+            values = self.raw * self.global_reserve / self.cap if self.cap > 0 else self.raw.copy()
+        return pd.Series(values, index=self.teams)
+
+    def _apply(self, side, team_id, quantity, price, filled=True):
+        # Record one validated event and, if filled, fold it into the state and reprice its team.
+        self.events.append(side, team_id, quantity, price, filled)
+        if not filled:
+            return
+        signed = quantity if side == BUY else -quantity
+        self.cash -= signed * price
+        self.holdings[team_id] += signed
+        self.global_holdings[team_id] += signed
+        new_raw = self.base[team_id] * (1 + self._scarcity_penalty(team_id))
+        self.cap += (new_raw - self.raw[team_id]) * self.supply[team_id]
+        self.raw[team_id] = new_raw
+
+    def submit(self, order):
+        """Validate and apply one order at the current price; returns a Fill."""
+        team_id = self.team_ids[order.team]
+        side = ORDER_SIDES.index(order.side)
+        quantity = int(order.quantity)
+        price = float(self.price(team_id))
+        total = quantity * price
+        if quantity <= 0:
+            return Fill(order, False, price, "Quantity must be positive.")
+        if side == BUY and self.cash < total:
+            self._apply(side, team_id, quantity, price, filled=False)
+            return Fill(order, False, price, "Insufficient funds.")
+        if side == SELL and self.holdings[team_id] < quantity:
+            self._apply(side, team_id, quantity, price, filled=False)
+            return Fill(order, False, price, "You don't own that many tokens.")
+        self._apply(side, team_id, quantity, price)
+        verb = "Purchased" if side == BUY else "Sold"
+        return Fill(order, True, price, f"{verb} {quantity} {order.team} tokens for ${total:.2f}")
+
+    def submit_batch(self, orders):
+        """Apply queued orders in sequence, each at the price left by the previous ones."""
+        return [self.submit(order) for order in orders]
+
+    def holdings_series(self):
+        return pd.Series(self.holdings, index=self.teams)
+
+    def event_frame(self):
+        """Every validated order, filled or rejected, in order, with team and side labels."""
+        return self.events.to_frame({"Team": self.teams, "Side": ORDER_SIDES})
+
+    @classmethod
+    def replay(cls, results, events, cash=STARTING_CASH):
+        """Rebuild an engine by re-applying an `event_frame` (or equivalent) to `results`."""
+        engine = cls(results, cash=cash)
+        columns = (events[name] for name in ("Side", "Team", "Quantity", "Price", "Filled"))
+        for side, team, quantity, price, filled in zip(*columns):
+            engine._apply(ORDER_SIDES.index(side), engine.team_ids[team], int(quantity), float(price), bool(filled))
+        return engine
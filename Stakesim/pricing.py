@@ -0,0 +1,60 @@
+import numpy as np
+
+MIN_PRICE = 0.01
+PRICE_FLOOR_BAND = 0.011
+
+
+def apply_zero_sum_price_change(prices, supply, circulating, target, direction, quantity):
+    """Move one team's price and offset the market-cap change across the rest.
+
+    `prices` (float) and `supply` / `circulating` (int) are arrays indexed by
+    team id. `prices` is updated in place and returned. Tokens within the
+    floor band do not absorb any of the offset.
+    """
+    target_supply = supply[target]
+    target_circulating = circulating[target]
+    available = max(target_supply - target_circulating, 1e-6)
+    scarcity_multiplier = 1 + (target_circulating / available)
+    base_delta = 0.01 * quantity
+    raw_delta_price = base_delta * scarcity_multiplier if direction == "up" else -base_delta * scarcity_multiplier
+
+    old_price = prices[target]
+    proposed_price = old_price + raw_delta_price
+    compensating_effect = 0.0
+
+    if direction == "down" and proposed_price < 0.01:
+        softened_delta = max(0.4 * raw_delta_price, -old_price + 0.01)  # softened, not below min
+        compensating_effect = (raw_delta_price - softened_delta) * target_supply
+        delta_price = softened_delta
+    else:
+        delta_price = raw_delta_price
+
+    new_price = max(old_price + delta_price, MIN_PRICE)
+    delta_mc = (new_price - old_price) * target_supply
+    prices[target] = new_price
+
+    if abs(delta_mc) < 1e-6 and compensating_effect == 0:
+        return prices
+
+    eligible = prices > PRICE_FLOOR_BAND
+    eligible[target] = False
+    eligible_ids = np.flatnonzero(eligible)
+    if eligible_ids.size == 0:
+        return prices
+
+    eligible_supply = supply[eligible_ids]
+    total_supply_others = eligible_supply.sum()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if total_supply_others > 0:
+            share = eligible_supply / total_supply_others
+        else:
+            share = np.full(eligible_ids.size, 1 / eligible_ids.size)
+        adjusted = np.maximum(prices[eligible_ids] + (-delta_mc * share / eligible_supply), MIN_PRICE)
+
+        if compensating_effect > 0:
+            share = eligible_supply / total_supply_others
+            adjusted = np.maximum(adjusted + (-compensating_effect * share / eligible_supply), MIN_PRICE)
+
+    prices[eligible_ids] = adjusted
+    return prices
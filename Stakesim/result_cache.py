@@ -0,0 +1,97 @@
+"""Memoized simulation results: a bounded in-memory LRU with an optional on-disk tier."""
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from simulation import config_key, simulate
+
+DEFAULT_CACHE_DIR = Path(".result_cache")
+
+
+class ResultCache:
+    """LRU cache of results dicts keyed by `config_key` (config, seed and engine version).
+
+    Up to `maxsize` results are kept in memory. With `cache_dir`, every
+    result is also pickled to disk, so it outlives the process and is
+    promoted back into memory on its next lookup. Unseeded configs are
+    never looked up, since each of their runs is a fresh draw, but their
+    results are stored under the seed they were given.
+    """
+
+    def __init__(self, maxsize=16, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, config):
+        """Cached results for a seeded `config`, or None (counted as a miss)."""
+        if config.seed is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        key = config_key(config)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.cache_dir is not None and self._path(key).exists():
+            with open(self._path(key), "rb") as f:
+                results = pickle.load(f)
+            self._remember(key, results)
+            with self._lock:
+                self.disk_hits += 1
+            return results
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, results):
+        """Store a results dict under the config and seed it records."""
+        key = config_key(results["config"])
+        self._remember(key, results)
+        if self.cache_dir is not None:
+            # Write-then-rename so a concurrent reader never sees a partial file.
+            tmp = self._path(key).with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(results, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+
+    def _remember(self, key, results):
+        with self._lock:
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def run(self, config, on_progress=None):
+        """Results for `config`, from the cache when possible, else from a fresh `simulate` run."""
+        results = self.get(config)
+        if results is not None:
+            if on_progress is not None:
+                on_progress(1.0)
+            return results
+        results = simulate(config, on_progress=on_progress)
+        self.put(results)
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir is not None:
+            for path in self.cache_dir.glob("*.pkl"):
+                path.unlink()
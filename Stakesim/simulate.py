@@ -0,0 +1,116 @@
+"""Headless command-line runner for the simulation engine.
+
+Usage (from the repository root):
+
+    python -m Stakesim.simulate --days 90 --users-per-day 10 --out sim_output
+"""
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from simulation import Engine, SimulationConfig, user_days  # noqa: E402
+
+LP_COLUMNS = ["Day", "Amount", "Proportional Pool Share at Entry", "Reserve at Entry"]
+
+SUMMARY_KEYS = ["total_fees", "global_reserve", "active_users_30d", "avg_volume_per_user_30d"]
+
+
+def write_results(results, out_dir):
+    """Write a results dict from `simulate` to `out_dir` as CSV files plus summary.json.
+
+    summary.json records the seed and config, so `replay(summary["seed"],
+    summary["config"])` reproduces the run.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    results["mcap_df"].to_csv(out_dir / "mcap.csv", index=False)
+    results["price_df"].to_csv(out_dir / "prices.csv", index_label="Day")
+    results["supply_df"].to_csv(out_dir / "supply.csv", index_label="Day")
+    results["user_holdings_df"].to_csv(out_dir / "user_holdings.csv", index_label="Day")
+    if results["user_tokens"] is not None:
+        results["user_tokens"].to_csv(out_dir / "user_tokens.csv", index_label="User")
+    results["tx_log"].to_csv(out_dir / "tx_log.csv", index=False)
+    results["failed_tx_log"].to_csv(out_dir / "failed_tx_log.csv", index=False)
+    pd.DataFrame(results["lp_contributions"], columns=LP_COLUMNS).to_csv(out_dir / "lp_contributions.csv", index=False)
+    pd.DataFrame({
+        "Final Price": results["final_prices"],
+        "Final Supply": results["final_supply"],
+        "Buy Volume": pd.Series(results["buy_volume"]),
+    }).to_csv(out_dir / "final_market.csv", index_label="Team")
+
+    summary = {key: np.asarray(results[key]).item() for key in SUMMARY_KEYS}
+    summary["seed"] = results["seed"]
+    summary["config"] = asdict(results["config"])
+    with open(out_dir / "summary.json", "w") as f:
+        json.dump(summary, f, indent=2)
+    return out_dir
+
+
+def _print_progress(fraction):
+    print(f"\rsimulating... {fraction:6.1%}", end="", file=sys.stderr, flush=True)
+    if fraction >= 1:
+        print(file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Stakesim token simulation without the Streamlit UI.")
+    parser.add_argument("--days", type=int, default=SimulationConfig.sim_days, help="number of simulated days")
+    parser.add_argument("--users-per-day", type=int, default=SimulationConfig.users_per_day, help="new users per day")
+    parser.add_argument("--transaction-prob", type=float, default=SimulationConfig.transaction_prob,
+                        help="probability a user trades on a given day")
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed; a fresh one is drawn and recorded if omitted")
+    parser.add_argument("--out", default="sim_output", help="directory to write results to")
+    parser.add_argument("--debug", action="store_true", help="check ledger consistency every day")
+    parser.add_argument("--high-population", action="store_true",
+                        help="skip per-transaction logs and per-user holdings for 100k+ user runs")
+    parser.add_argument("--history-every", type=int, default=SimulationConfig.history_every,
+                        help="record per-team history every k days")
+    parser.add_argument("--chunk-size", type=int, default=SimulationConfig.chunk_size,
+                        help="users processed per chunk each day")
+    parser.add_argument("--backend", choices=["auto", "python", "numba"], default=SimulationConfig.backend,
+                        help="trade-loop backend; auto uses Numba when installed")
+    parser.add_argument("--checkpoint-every", type=int, default=None, metavar="N",
+                        help="save the engine state every N days to --checkpoint-dir")
+    parser.add_argument("--checkpoint-dir", default="checkpoints", help="directory for checkpoint files")
+    parser.add_argument("--resume", default=None, metavar="CHECKPOINT",
+                        help="continue from a checkpoint file; only --backend and --debug apply on top of it")
+    parser.add_argument("--quiet", action="store_true", help="suppress progress output")
+    args = parser.parse_args(argv)
+
+    config = SimulationConfig(
+        sim_days=args.days,
+        users_per_day=args.users_per_day,
+        transaction_prob=args.transaction_prob,
+        seed=args.seed,
+        debug=args.debug,
+        chunk_size=args.chunk_size,
+        high_population=args.high_population,
+        history_every=args.history_every,
+        backend=args.backend,
+    )
+    on_progress = None if args.quiet else _print_progress
+    start = time.perf_counter()
+    if args.resume:
+        engine = Engine.load(args.resume, backend=args.backend, debug=args.debug)
+        config = engine.config
+    else:
+        engine = Engine(config)
+    results = engine.run(on_progress, checkpoint_every=args.checkpoint_every, checkpoint_dir=args.checkpoint_dir)
+    elapsed = time.perf_counter() - start
+    out_dir = write_results(results, args.out)
+    print(f"Simulated {user_days(config):,} user-days in {elapsed:.2f}s "
+          f"({user_days(config) / elapsed:,.0f} user-days/s)")
+    print(f"Seed {results['seed']}; wrote results to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,19 @@
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
-import random
-import streamlit as st
+from dataclasses import asdict, dataclass, replace
+from typing import NamedTuple
+
+from backends import get_backend
+from ledger import HoldingsLedger
+from txlog import ACTIONS, FAIL_REASONS, FAILED_TX_SCHEMA, TX_SCHEMA, ColumnarLog, NullLog
+
+# Bump whenever a change alters results for a given config and seed, so
+# cached results from older engines are not reused.
+ENGINE_VERSION = 2
 
 # Constants
 INITIAL_GLOBAL_RESERVE = 13400
@@ -10,251 +23,556 @@ NUM_TEAMS = 134
 INITIAL_SUPPLY_PER_TEAM = 100
 INITIAL_CASH = 100
 CHURN_PROBABILITY = 0.10
-MIN_PRICE = 0.01
-
-def run_simulation(sim_days, users_per_day, transaction_prob):
-    teams = [f"Team_{i}" for i in range(NUM_TEAMS)]
-
-    hot_ids = random.sample(range(NUM_TEAMS), 10)
-    remaining = [i for i in range(NUM_TEAMS) if i not in hot_ids]
-    warm_ids = random.sample(remaining, 30)
-    remaining = [i for i in remaining if i not in warm_ids]
-    mid_ids = random.sample(remaining, 30)
-    cold_ids = [i for i in range(NUM_TEAMS) if i not in hot_ids + warm_ids + mid_ids]
-
-    hot_price = 6.0
-    warm_price = 1.0
-    mid_price = 0.3
-
-    fixed_cap = (
-        10 * hot_price * INITIAL_SUPPLY_PER_TEAM +
-        30 * warm_price * INITIAL_SUPPLY_PER_TEAM +
-        30 * mid_price * INITIAL_SUPPLY_PER_TEAM
-    )
-    remaining_cap = INITIAL_GLOBAL_RESERVE - fixed_cap
-    cold_price = remaining_cap / (len(cold_ids) * INITIAL_SUPPLY_PER_TEAM)
-
-    base_prices = {}
-    for i in range(NUM_TEAMS):
-        team = f"Team_{i}"
-        if i in hot_ids:
-            base_prices[team] = hot_price
-        elif i in warm_ids:
-            base_prices[team] = warm_price
-        elif i in mid_ids:
-            base_prices[team] = mid_price
-        else:
-            base_prices[team] = cold_price
-    prices = pd.Series(base_prices)
+FEE_RATE = 0.0175
+LP_INJECTION = 13400
+HOT_PRICE = 6.0
+WARM_PRICE = 1.0
+MID_PRICE = 0.3
+SELL_QUANTITIES = np.array([1, 2, 5])
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+@dataclass
+class SimulationConfig:
+    sim_days: int = 30
+    users_per_day: int = 5
+    transaction_prob: float = 0.5
+    seed: int | None = None
+    debug: bool = False
+    # Users are processed in chunks of this size each day, bounding the
+    # per-day draw arrays; runs below one chunk are unaffected by it.
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    # Skip per-transaction logs and the per-user holdings frame so that
+    # populations of 100k+ users fit in memory. Aggregate results are kept.
+    high_population: bool = False
+    # Record the per-team price/supply/holdings history every k days (plus
+    # the final day) to shrink very long runs; 1 records every day.
+    history_every: int = 1
+    # Trade-loop backend: "python", "numba", or "auto" (Numba when installed).
+    # All backends give identical results for a given seed.
+    backend: str = "auto"
+    # Tokenomics; defaults are the module constants above
+    reserve_increment: int = RESERVE_INCREMENT
+    max_ownership_ratio: float = MAX_OWNERSHIP_RATIO
+    churn_probability: float = CHURN_PROBABILITY
+    fee_rate: float = FEE_RATE
+    lp_injection: float = LP_INJECTION
+    hot_price: float = HOT_PRICE
+    warm_price: float = WARM_PRICE
+    mid_price: float = MID_PRICE
+
+
+def annualized_revenue(results, fee_rate=FEE_RATE):
+    """Fee revenue per year implied by the last 30 days of buy volume."""
+    return results["active_users_30d"] * results["avg_volume_per_user_30d"] * fee_rate * 12
+
+
+def user_days(config):
+    """Total user-days a run processes, the unit engine throughput is reported in."""
+    return config.users_per_day * config.sim_days * (config.sim_days + 1) // 2
+
+
+def summary_metrics(results, fee_rate=FEE_RATE):
+    """Scalar outcome metrics of one run, as used by ensembles and sweeps."""
+    final_market_cap = results["mcap_df"]["Market Cap"].iloc[-1]
+    return {
+        "active_users_30d": results["active_users_30d"],
+        "avg_volume_per_user_30d": results["avg_volume_per_user_30d"],
+        "annualized_revenue": annualized_revenue(results, fee_rate),
+        "total_fees": results["total_fees"],
+        "global_reserve": results["global_reserve"],
+        "final_market_cap": final_market_cap,
+        "reserve_coverage": results["global_reserve"] / final_market_cap if final_market_cap else float("nan"),
+    }
 
-    user_tokens = pd.DataFrame(0, index=[], columns=teams)
-    token_supply = pd.Series(INITIAL_SUPPLY_PER_TEAM, index=teams)
-    user_cash = {}
-    users = []
 
-    global_reserve = INITIAL_GLOBAL_RESERVE
-    reserve_buffer = 0
-    total_fees_collected = 0
+class DayDraws(NamedTuple):
+    churn: np.ndarray          # bool: user churns today
+    active: np.ndarray         # bool: user trades today
+    sell_side: np.ndarray      # bool: user sells if holding anything
+    buy_team: np.ndarray       # team id a buy would target
+    sell_pick: np.ndarray      # uniform [0, 1) picking among owned teams
+    sell_quantity: np.ndarray  # requested sell quantity
+
+
+def sample_day(rng, num_users, churn_probability, transaction_prob, cum_weights):
+    """Draw every user's decisions for one day in a single vectorized step.
+
+    Draws are made for all users regardless of which branch they end up
+    in, so the stream consumed per day depends only on the user count.
+    """
+    buy_draw = rng.random(num_users) * cum_weights[-1]
+    return DayDraws(
+        churn=rng.random(num_users) < churn_probability,
+        active=rng.random(num_users) < transaction_prob,
+        sell_side=rng.random(num_users) < 0.5,
+        buy_team=np.minimum(np.searchsorted(cum_weights, buy_draw, side="right"), len(cum_weights) - 1),
+        sell_pick=rng.random(num_users),
+        sell_quantity=SELL_QUANTITIES[rng.integers(0, len(SELL_QUANTITIES), num_users)],
+    )
 
-    price_history, supply_history, reserve_history, user_holdings_history = [], [], [], []
-    tx_log, failed_tx_log, lp_contributions = [], [], []
-    buy_volume = {team: 0.0 for team in teams}
-    mcap_history = []
 
-    def rotate_hot_warm():
-        nonlocal hot_ids, warm_ids
+def _whole_increments(amount, increment):
+    # Number of times `increment` can be taken off `amount` while at least
+    # `increment` remains, i.e. the pass count of a unit-step loop.
+    steps = int(amount // increment)
+    while amount - steps * increment >= increment:
+        steps += 1
+    while steps > 0 and amount - (steps - 1) * increment < increment:
+        steps -= 1
+    return steps
+
+
+def rebase_reserve(token_supply, circulating, global_reserve, reserve_buffer, increment):
+    """Move whole increments of the reserve buffer into (or out of) the reserve.
+
+    Each increment in adds one token to every team; each increment out
+    removes one token from every team that still has uncirculated supply,
+    so a team is never shrunk below its circulating amount. Equivalent to
+    stepping one increment at a time, in O(teams). `token_supply` is
+    updated in place; returns the new `(global_reserve, reserve_buffer)`.
+    """
+    if reserve_buffer > 0:
+        steps = _whole_increments(reserve_buffer, increment)
+        token_supply += steps
+        return global_reserve + steps * increment, reserve_buffer - steps * increment
+
+    steps = _whole_increments(-reserve_buffer, increment)
+    if steps:
+        slack = np.maximum(token_supply - circulating, 0)
+        token_supply -= np.minimum(slack, steps)
+    return global_reserve - steps * increment, reserve_buffer + steps * increment
+
+
+def config_key(config):
+    """Stable cache key for a fully specified configuration and engine version.
+
+    The trade-loop backend is left out: every backend gives the same results.
+    """
+    params = asdict(config)
+    del params["backend"]
+    payload = json.dumps({"engine": ENGINE_VERSION, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _json_scalar(value):
+    # NumPy scalars that json cannot serialize natively.
+    return value.item()
+
+
+def resolve_seed(config):
+    """Return `config` with a concrete seed, drawing a fresh one from OS entropy if it has none."""
+    if config.seed is not None:
+        return config
+    return replace(config, seed=int(np.random.SeedSequence().generate_state(1)[0]))
+
+
+def replay(seed, config):
+    """Re-run `config` under `seed`, reproducing the recorded run bit for bit.
+
+    `config` may be a SimulationConfig or a plain dict of its fields (as
+    written to summary.json), e.g. `replay(results["seed"], results["config"])`.
+    """
+    if isinstance(config, dict):
+        config = SimulationConfig(**config)
+    return simulate(replace(config, seed=seed))
+
+
+def run_simulation(sim_days, users_per_day, transaction_prob, seed=None, debug=False, on_progress=None, **params):
+    config = SimulationConfig(sim_days, users_per_day, transaction_prob, seed=seed, debug=debug, **params)
+    return simulate(config, on_progress=on_progress)
+
+
+class DaySnapshot(NamedTuple):
+    day: int                    # 1-based day just completed
+    prices: pd.Series           # per-team prices at the end of the day
+    supply: pd.Series           # per-team token supply at the end of the day
+    global_reserve: int
+    market_cap: float
+    transactions: pd.DataFrame  # the day's successful transactions (User as integer id)
+
+
+class Engine:
+    """State of one run, advanced a day at a time with `step`.
+
+    `simulate` runs an Engine to the end; `simulate_stream` also yields a
+    DaySnapshot after every day.
+    """
+
+    def __init__(self, config):
+        config = resolve_seed(config)
+        self.config = config
+        self.trade_chunk = get_backend(config.backend)
+        self.rng = np.random.default_rng(config.seed)
+        rng = self.rng
+        sim_days = config.sim_days
+
+        self.hot_ids = rng.choice(NUM_TEAMS, 10, replace=False).tolist()
+        remaining = [i for i in range(NUM_TEAMS) if i not in self.hot_ids]
+        self.warm_ids = rng.choice(remaining, 30, replace=False).tolist()
+        remaining = [i for i in remaining if i not in self.warm_ids]
+        mid_ids = rng.choice(remaining, 30, replace=False).tolist()
+        self.mid_ids = mid_ids
+        cold_ids = [i for i in range(NUM_TEAMS) if i not in self.hot_ids + self.warm_ids + mid_ids]
+
+        fixed_cap = (
+            10 * config.hot_price * INITIAL_SUPPLY_PER_TEAM +
+            30 * config.warm_price * INITIAL_SUPPLY_PER_TEAM +
+            30 * config.mid_price * INITIAL_SUPPLY_PER_TEAM
+        )
+        remaining_cap = INITIAL_GLOBAL_RESERVE - fixed_cap
+        cold_price = remaining_cap / (len(cold_ids) * INITIAL_SUPPLY_PER_TEAM)
+        if cold_price <= 0:
+            raise ValueError("Hot/warm/mid tier prices leave no reserve for cold teams; lower the tier prices.")
+
+        self.prices = np.full(NUM_TEAMS, cold_price)
+        self.prices[self.hot_ids] = config.hot_price
+        self.prices[self.warm_ids] = config.warm_price
+        self.prices[mid_ids] = config.mid_price
+
+        self.ledger = HoldingsLedger(NUM_TEAMS, capacity=max(sim_days * config.users_per_day, 1))
+        self.token_supply = np.full(NUM_TEAMS, INITIAL_SUPPLY_PER_TEAM, dtype=np.int64)
+        self.volume_30d = 0.0
+
+        self.global_reserve = INITIAL_GLOBAL_RESERVE
+        self.reserve_buffer = 0
+        self.total_fees_collected = 0
+
+        # Per-team history is preallocated and filled in place, one row per recorded day.
+        self.history_days = np.array(
+            [day for day in range(sim_days) if day % config.history_every == 0 or day == sim_days - 1],
+            dtype=np.int64,
+        )
+        self.history_row = np.full(sim_days, -1)
+        self.history_row[self.history_days] = np.arange(len(self.history_days))
+        self.price_history = np.empty((len(self.history_days), NUM_TEAMS), dtype=np.float32)
+        self.supply_history = np.empty((len(self.history_days), NUM_TEAMS), dtype=np.int32)
+        self.user_holdings_history = np.empty((len(self.history_days), NUM_TEAMS), dtype=np.int32)
+        self.reserve_history = []
+        log_type = NullLog if config.high_population else ColumnarLog
+        self.tx_log = log_type(TX_SCHEMA)
+        self.failed_tx_log = log_type(FAILED_TX_SCHEMA)
+        self.lp_contributions = []
+        self.buy_volume = np.zeros(NUM_TEAMS)
+        # Cumulative buy value at the end of each day, for the trailing
+        # 30-day volume of a run that has not finished yet.
+        self.volume_history = np.zeros(sim_days)
+        self.mcap_history = []
+
+        # Buy-side team sampling table; only changes when the tiers rotate.
+        self.tier_weights = np.empty(NUM_TEAMS, dtype=np.int64)
+        self.cum_weights = None
+
+        self.day = 0
+        self._day_tx_start = 0
+        # Labels are attached only when snapshots and results are built.
+        self.teams = pd.Index([f"Team_{i}" for i in range(NUM_TEAMS)])
+
+    @property
+    def done(self):
+        return self.day >= self.config.sim_days
+
+    def _rebuild_weights(self):
+        self.tier_weights[:] = 1
+        self.tier_weights[self.mid_ids] = 2
+        self.tier_weights[self.warm_ids] = 3
+        self.tier_weights[self.hot_ids] = 6
+        self.cum_weights = np.cumsum(self.tier_weights)
+
+    def _pick(self, ids):
+        return ids[self.rng.integers(len(ids))]
+
+    def _rotate_hot_warm(self):
+        hot_ids, warm_ids = self.hot_ids, self.warm_ids
         cold_ids = [i for i in range(NUM_TEAMS) if i not in hot_ids and i not in warm_ids]
         if cold_ids:
-            promoted_to_warm = random.choice(cold_ids)
+            promoted_to_warm = self._pick(cold_ids)
             warm_ids.append(promoted_to_warm)
         if warm_ids:
-            promoted_to_hot = random.choice(warm_ids)
+            promoted_to_hot = self._pick(warm_ids)
             hot_ids.append(promoted_to_hot)
             warm_ids.remove(promoted_to_hot)
         if hot_ids:
-            demoted_to_warm = random.choice(hot_ids)
+            demoted_to_warm = self._pick(hot_ids)
             warm_ids.append(demoted_to_warm)
             hot_ids.remove(demoted_to_warm)
         if warm_ids:
-            demoted_to_cold = random.choice(warm_ids)
+            demoted_to_cold = self._pick(warm_ids)
             warm_ids.remove(demoted_to_cold)
+        self._rebuild_weights()
 
-    def price_halver(price):
-        if price >= 0.01:
-            return price
-        return 0.01 * (price / 0.01) ** 0.5
-
-    def apply_zero_sum_price_change(prices, target_team, direction, quantity):
-        circulating = user_tokens[target_team].sum()
-        available = max(token_supply[target_team] - circulating, 1e-6)
-        scarcity_multiplier = 1 + (circulating / available)
-        base_delta = 0.01 * quantity
-        raw_delta_price = base_delta * scarcity_multiplier if direction == "up" else -base_delta * scarcity_multiplier
-
-        old_price = prices[target_team]
-        proposed_price = old_price + raw_delta_price
-        softened = False
-        compensating_effect = 0.0
-
-        if direction == "down" and proposed_price < 0.01:
-            softened = True
-            softened_delta = max(0.4 * raw_delta_price, -old_price + 0.01)  # softened, not below min
-            compensating_effect = (raw_delta_price - softened_delta) * token_supply[target_team]
-            delta_price = softened_delta
-        else:
-            delta_price = raw_delta_price
-
-        new_price = max(old_price + delta_price, MIN_PRICE)
-        delta_mc = (new_price - old_price) * token_supply[target_team]
-        prices[target_team] = new_price
-
-        if abs(delta_mc) < 1e-6 and compensating_effect == 0:
-            return prices
-
-        others = [t for t in teams if t != target_team]
-        eligible_tokens = []
-        total_supply_others = 0
-
-        for t in others:
-            if prices[t] > 0.011:  # Token is not near price floor
-                eligible_tokens.append(t)
-                total_supply_others += token_supply[t]
-
-        for t in eligible_tokens:
-            share = token_supply[t] / total_supply_others if total_supply_others > 0 else 1 / len(eligible_tokens)
-            adjustment = -delta_mc * share / token_supply[t]
-            prices[t] = max(prices[t] + adjustment, MIN_PRICE)
-
-        if compensating_effect > 0 and eligible_tokens:
-            # Distribute unapplied adjustment across eligible tokens
-            for t in eligible_tokens:
-                share = token_supply[t] / total_supply_others
-                prices[t] += -compensating_effect * share / token_supply[t]
-                prices[t] = max(prices[t], MIN_PRICE)
-
-        return prices
-
-
-    progress = st.progress(0)
-    for day in range(sim_days):
-        progress.progress((day + 1) / sim_days)
+    def step(self):
+        """Simulate the next day."""
+        config = self.config
+        day = self.day
+        ledger = self.ledger
+        self._day_tx_start = len(self.tx_log)
 
         if day % 7 == 0:
-            rotate_hot_warm()
+            self._rotate_hot_warm()
 
         if (day + 1) % 30 == 0:
-            lp_amount = 13400
-            proportion = lp_amount / (global_reserve + 1e-6)
-            lp_contributions.append((day + 1, lp_amount, proportion, global_reserve))
-            reserve_buffer += lp_amount
-
-        for _ in range(users_per_day):
-            user = f"user_{len(users)}"
-            users.append(user)
-            user_cash[user] = INITIAL_CASH
-            user_tokens.loc[user] = 0
-
-        for user in users:
-            churn = random.random() < (CHURN_PROBABILITY / sim_days)
-            if churn:
-                for team in teams:
-                    qty = user_tokens.loc[user, team]
-                    if qty > 0:
-                        payout = prices[team] * qty
-                        user_cash[user] += payout
-                        reserve_buffer -= payout
-                        user_tokens.loc[user, team] = 0
-                        tx_log.append((day + 1, user, "churn_sell", team, qty, 0.0, payout))
-                continue
-
-            if random.random() < transaction_prob:
-                owned = [t for t in teams if user_tokens.loc[user, t] > 0]
-                if owned and random.random() < 0.5:
-                    team = random.choice(owned)
-                    price = prices[team]
-                    quantity = min(user_tokens.loc[user, team], random.choice([1, 2, 5]))
-                    payout = price * quantity
-                    user_cash[user] += payout
-                    reserve_buffer -= payout
-                    user_tokens.loc[user, team] -= quantity
-                    tx_log.append((day + 1, user, "sell", team, quantity, 0.0, payout))
-                    prices = apply_zero_sum_price_change(prices, team, "down", quantity)
-                else:
-                    weights = [
-                        6 if i in hot_ids else
-                        3 if i in warm_ids else
-                        2 if i in mid_ids else
-                        1 for i in range(NUM_TEAMS)
-                    ]
-                    team_id = random.choices(range(NUM_TEAMS), weights=weights)[0]
-                    team = f"Team_{team_id}"
-                    price = max(prices[team], MIN_PRICE)
-                    quantity = max(1, int(round(10 / price)))
-                    total = price * quantity
-
-                    available = token_supply[team] - user_tokens[team].sum()
-                    holding = user_tokens.loc[user, team]
-                    max_allowed = MAX_OWNERSHIP_RATIO * token_supply[team]
-
-                    if user_cash[user] >= total and available >= quantity and holding + quantity <= max_allowed:
-                        fee = total * 0.0175
-                        net = total - fee
-                        user_cash[user] -= total
-                        reserve_buffer += net
-                        total_fees_collected += fee
-                        user_tokens.loc[user, team] += quantity
-                        buy_volume[team] += price * quantity
-                        tx_log.append((day + 1, user, "buy", team, quantity, fee, total))
-                        prices = apply_zero_sum_price_change(prices, team, "up", quantity)
-                    else:
-                        reason = (
-                            "insufficient funds" if user_cash[user] < total else
-                            "supply constraint" if available < quantity else
-                            "whale constraint"
-                        )
-                        failed_tx_log.append((day + 1, user, "buy", team, quantity, reason))
-
-        while abs(reserve_buffer) >= RESERVE_INCREMENT:
-            if reserve_buffer > 0:
-                for team in teams:
-                    token_supply[team] += 1
-                global_reserve += RESERVE_INCREMENT
-                reserve_buffer -= RESERVE_INCREMENT
-            else:
-                for team in teams:
-                    if token_supply[team] > user_tokens[team].sum():
-                        token_supply[team] -= 1
-                global_reserve -= RESERVE_INCREMENT
-                reserve_buffer += RESERVE_INCREMENT
-
-        price_history.append(prices.copy())
-        supply_history.append(token_supply.copy())
-        reserve_history.append(global_reserve)
-        user_holdings_history.append(user_tokens.sum().copy())
-        total_market_cap = (prices * token_supply).sum()
-        mcap_history.append((day + 1, total_market_cap, global_reserve))
-
-    tx_df = pd.DataFrame(tx_log, columns=["Day", "User", "Type", "Team", "Quantity", "Fee", "Nominal Value"])
-    last_30 = tx_df[(tx_df["Day"] > sim_days - 30) & (tx_df["Type"] == "buy")]
-    active_users_30d = last_30["User"].nunique()
-    total_volume_30d = last_30["Nominal Value"].sum()
-    avg_volume_per_user_30d = total_volume_30d / max(active_users_30d, 1)
-    
-    return {
-        "mcap_df": pd.DataFrame(mcap_history, columns=["Day", "Market Cap", "Global Reserve"]),
-        "price_df": pd.DataFrame(price_history),
-        "supply_df": pd.DataFrame(supply_history),
-        "reserve_df": pd.DataFrame(reserve_history, columns=["Global Reserve"]),
-        "user_holdings_df": pd.DataFrame(user_holdings_history),
-        "tx_log": tx_log,
-        "failed_tx_log": failed_tx_log,
-        "lp_contributions": lp_contributions,
-        "user_tokens": user_tokens,
-        "total_fees": total_fees_collected,
-        "global_reserve": global_reserve,
-        "final_prices": prices.copy(),
-        "final_supply": token_supply.copy(),
-        "buy_volume": buy_volume,
-        "active_users_30d": active_users_30d,
-        "avg_volume_per_user_30d": avg_volume_per_user_30d
-    }
+            lp_amount = config.lp_injection
+            proportion = lp_amount / (self.global_reserve + 1e-6)
+            self.lp_contributions.append((day + 1, lp_amount, proportion, self.global_reserve))
+            self.reserve_buffer += lp_amount
+
+        for _ in range(config.users_per_day):
+            ledger.add_user(cash=INITIAL_CASH)
+
+        reserve_buffer, total_fees_collected, volume_30d = (
+            self.reserve_buffer, self.total_fees_collected, self.volume_30d
+        )
+        for chunk_start in range(0, ledger.num_users, config.chunk_size):
+            chunk_users = min(config.chunk_size, ledger.num_users - chunk_start)
+            draws = sample_day(
+                self.rng, chunk_users, config.churn_probability / config.sim_days, config.transaction_prob,
+                self.cum_weights,
+            )
+            reserve_buffer, total_fees_collected, volume_30d = self.trade_chunk(
+                ledger, self.prices, self.token_supply, self.buy_volume, draws, day, chunk_start, config,
+                self.tx_log, self.failed_tx_log, reserve_buffer, total_fees_collected, volume_30d,
+            )
+        self.total_fees_collected, self.volume_30d = total_fees_collected, volume_30d
+
+        self.global_reserve, self.reserve_buffer = rebase_reserve(
+            self.token_supply, ledger.circulating, self.global_reserve, reserve_buffer, config.reserve_increment
+        )
+
+        if config.debug:
+            ledger.check_circulating()
+
+        row = self.history_row[day]
+        if row >= 0:
+            self.price_history[row] = self.prices
+            self.supply_history[row] = self.token_supply
+            self.user_holdings_history[row] = ledger.circulating
+        self.volume_history[day] = self.buy_volume.sum()
+        self.reserve_history.append(self.global_reserve)
+        total_market_cap = (self.prices * self.token_supply).sum()
+        self.mcap_history.append((day + 1, total_market_cap, self.global_reserve))
+        self.day += 1
+
+    def snapshot(self):
+        """DaySnapshot of the day `step` last completed."""
+        labels = {"Action": ACTIONS, "Team": self.teams}
+        _, market_cap, global_reserve = self.mcap_history[-1]
+        return DaySnapshot(
+            day=self.day,
+            prices=pd.Series(self.prices.copy(), index=self.teams),
+            supply=pd.Series(self.token_supply.copy(), index=self.teams),
+            global_reserve=global_reserve,
+            market_cap=market_cap,
+            transactions=self.tx_log.to_frame(labels, start=self._day_tx_start),
+        )
+
+    def run(self, on_progress=None, checkpoint_every=None, checkpoint_dir=None):
+        """Step to the last day and return the results dict.
+
+        With `checkpoint_every`, the state is saved to `checkpoint_dir` as
+        `day_NNNN.npz` after every `checkpoint_every`-th day.
+        """
+        while not self.done:
+            if on_progress is not None:
+                on_progress((self.day + 1) / self.config.sim_days)
+            self.step()
+            if checkpoint_every and self.day % checkpoint_every == 0 and not self.done:
+                self.save(Path(checkpoint_dir) / f"day_{self.day:04d}.npz")
+        return self.results()
+
+    def save(self, path):
+        """Write the full engine state to `path` as a compressed .npz checkpoint.
+
+        Arrays are stored natively; scalars, tiers, RNG state and config go
+        in a JSON `meta` entry, so loading never needs pickle.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        ledger = self.ledger
+        n = ledger.num_users
+        recorded = int(np.count_nonzero(self.history_days < self.day))
+        meta = {
+            "engine": ENGINE_VERSION,
+            "config": asdict(self.config),
+            "day": self.day,
+            "rng": self.rng.bit_generator.state,
+            "hot_ids": self.hot_ids,
+            "warm_ids": self.warm_ids,
+            "mid_ids": self.mid_ids,
+            "volume_30d": self.volume_30d,
+            "global_reserve": self.global_reserve,
+            "reserve_buffer": self.reserve_buffer,
+            "total_fees_collected": self.total_fees_collected,
+            "lp_contributions": self.lp_contributions,
+        }
+        arrays = {
+            "prices": self.prices,
+            "token_supply": self.token_supply,
+            "buy_volume": self.buy_volume,
+            "holdings": ledger.holdings[:n],
+            "cash": ledger.cash[:n],
+            "last_buy_day": ledger.last_buy_day[:n],
+            "price_history": self.price_history[:recorded],
+            "supply_history": self.supply_history[:recorded],
+            "user_holdings_history": self.user_holdings_history[:recorded],
+            "reserve_history": np.asarray(self.reserve_history, dtype=np.int64),
+            "volume_history": self.volume_history[:self.day],
+            "mcap_history": np.asarray([mcap for _, mcap, _ in self.mcap_history], dtype=np.float64),
+        }
+        for prefix, log in (("tx", self.tx_log), ("failed_tx", self.failed_tx_log)):
+            for name in log.columns:
+                arrays[f"{prefix}/{name}"] = log.column(name)
+        np.savez_compressed(path, meta=np.array(json.dumps(meta, default=_json_scalar)), **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path, **overrides):
+        """Restore an engine saved with `save`, optionally forking it under changed config fields.
+
+        Any SimulationConfig field can be overridden except the run shape
+        (sim_days, history_every, high_population) and the tier prices
+        (hot_price, warm_price, mid_price), which only set day-0 prices and
+        so cannot change a run already under way. Overriding
+        `seed` reseeds the random stream from the checkpoint day on; without
+        it, the resumed run continues exactly where the saved one stopped.
+        """
+        fixed = sorted(set(overrides) & {
+            "sim_days", "history_every", "high_population", "hot_price", "warm_price", "mid_price",
+        })
+        if fixed:
+            raise ValueError(f"Cannot change {', '.join(fixed)} when resuming from a checkpoint.")
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data["meta"].item())
+            if meta["engine"] != ENGINE_VERSION:
+                raise ValueError(
+                    f"Checkpoint was written by engine version {meta['engine']}, not {ENGINE_VERSION}."
+                )
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+
+        saved = SimulationConfig(**meta["config"])
+        engine = cls(replace(saved, **overrides))
+        if "seed" not in overrides:
+            engine.rng.bit_generator.state = meta["rng"]
+        engine.day = meta["day"]
+        engine.hot_ids = meta["hot_ids"]
+        engine.warm_ids = meta["warm_ids"]
+        engine.mid_ids = meta["mid_ids"]
+        if engine.day > 0:
+            engine._rebuild_weights()
+        engine.volume_30d = meta["volume_30d"]
+        engine.global_reserve = meta["global_reserve"]
+        engine.reserve_buffer = meta["reserve_buffer"]
+        engine.total_fees_collected = meta["total_fees_collected"]
+        engine.lp_contributions = [tuple(row) for row in meta["lp_contributions"]]
+
+        engine.prices = arrays["prices"]
+        engine.token_supply = arrays["token_supply"]
+        engine.buy_volume = arrays["buy_volume"]
+        engine.ledger = HoldingsLedger.from_arrays(
+            arrays["holdings"], arrays["cash"], arrays["last_buy_day"],
+            capacity=saved.sim_days * saved.users_per_day,
+        )
+        recorded = len(arrays["price_history"])
+        engine.price_history[:recorded] = arrays["price_history"]
+        engine.supply_history[:recorded] = arrays["supply_history"]
+        engine.user_holdings_history[:recorded] = arrays["user_holdings_history"]
+        engine.reserve_history = arrays["reserve_history"].tolist()
+        engine.volume_history[:engine.day] = arrays["volume_history"]
+        engine.mcap_history = [
+            (day + 1, mcap, reserve)
+            for day, (mcap, reserve) in enumerate(zip(arrays["mcap_history"], engine.reserve_history))
+        ]
+        for prefix, log in (("tx", engine.tx_log), ("failed_tx", engine.failed_tx_log)):
+            log.extend(*(arrays[f"{prefix}/{name}"] for name in log.columns))
+        return engine
+
+    def results(self):
+        """The results dict for the days simulated so far.
+
+        Before the last day, the history covers the days completed and the
+        30-day activity figures are taken over the 30 days up to `day`.
+        """
+        config = self.config
+        day = self.day
+        ledger = self.ledger
+        teams = self.teams
+        active_users_30d = int(np.count_nonzero(ledger.last_buy_day[:ledger.num_users] > day - 30))
+        if self.done:
+            volume_30d = self.volume_30d
+        else:
+            cumulative = np.concatenate([[0.0], self.volume_history[:day]])
+            volume_30d = cumulative[-1] - cumulative[max(day - 30, 0)]
+        avg_volume_per_user_30d = volume_30d / max(active_users_30d, 1)
+
+        recorded = int(np.count_nonzero(self.history_days < day))
+        history_index = pd.Index(self.history_days[:recorded]) if config.history_every > 1 else pd.RangeIndex(day)
+        users = [] if config.high_population else [f"user_{i}" for i in range(ledger.num_users)]
+        labels = {"User": users, "Team": teams, "Action": ACTIONS, "Reason": FAIL_REASONS}
+        return {
+            "seed": config.seed,
+            "config": config,
+            "mcap_df": pd.DataFrame(self.mcap_history, columns=["Day", "Market Cap", "Global Reserve"]),
+            "price_df": pd.DataFrame(self.price_history[:recorded], index=history_index, columns=teams, copy=False),
+            "supply_df": pd.DataFrame(self.supply_history[:recorded], index=history_index, columns=teams, copy=False),
+            "reserve_df": pd.DataFrame(self.reserve_history, columns=["Global Reserve"]),
+            "user_holdings_df": pd.DataFrame(
+                self.user_holdings_history[:recorded], index=history_index, columns=teams, copy=False
+            ),
+            "tx_log": self.tx_log.to_frame(labels),
+            "failed_tx_log": self.failed_tx_log.to_frame(labels),
+            "lp_contributions": self.lp_contributions,
+            "user_tokens": None if config.high_population else ledger.to_frame(users, teams),
+            "total_fees": self.total_fees_collected,
+            "global_reserve": self.global_reserve,
+            "final_prices": pd.Series(self.prices.copy(), index=teams),
+            "final_supply": pd.Series(self.token_supply.copy(), index=teams),
+            "buy_volume": dict(zip(teams, self.buy_volume.tolist())),
+            "active_users_30d": active_users_30d,
+            "avg_volume_per_user_30d": avg_volume_per_user_30d
+        }
+
+
+def simulate(config, on_progress=None):
+    """Run the engine for a SimulationConfig without any UI dependency.
+
+    `on_progress`, if given, is called with the completed fraction (0-1]
+    after every simulated day. All randomness comes from one generator
+    seeded from `config.seed`; an unseeded config gets a fresh seed, and
+    the seed and config actually used are returned with the results.
+    """
+    return Engine(config).run(on_progress)
+
+
+def resume(path, on_progress=None, **overrides):
+    """Continue a run from a checkpoint to its last day and return the results.
+
+    Keyword overrides fork the run under changed parameters (see
+    `Engine.load`); without them the results match the uninterrupted run.
+    """
+    return Engine.load(path, **overrides).run(on_progress)
+
+
+class SimulationStream:
+    """Iterate over a run one day at a time.
+
+    Each iteration yields the DaySnapshot of the day just simulated; once
+    the last day is done, `results` holds the same dict `simulate` returns.
+    Stopping the iteration early simply abandons the run.
+    """
+
+    def __init__(self, config):
+        self.engine = Engine(config)
+        self.config = self.engine.config
+        self.results = None
+
+    def __iter__(self):
+        engine = self.engine
+        while not engine.done:
+            engine.step()
+            yield engine.snapshot()
+        self.results = engine.results()
+
+
+def simulate_stream(config):
+    """Streaming counterpart of `simulate`: `for snapshot in simulate_stream(config): ...`."""
+    return SimulationStream(config)
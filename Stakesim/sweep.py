@@ -0,0 +1,153 @@
+"""Parameter sweeps over SimulationConfig fields, run in parallel with a result cache.
+
+Usage (from the repository root):
+
+    python -m Stakesim.sweep --grid reserve_increment=67,134,268 fee_rate=0.01,0.0175,0.025 \\
+        --days 60 --out sweep.csv --rank total_fees
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields, replace
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from simulation import SimulationConfig, config_key, simulate, summary_metrics  # noqa: E402
+
+CONFIG_FIELDS = {f.name: f.type for f in fields(SimulationConfig)}
+DEFAULT_CACHE_DIR = Path(".sweep_cache")
+
+
+def grid(**axes):
+    """Cartesian product of per-parameter value lists, as override dicts."""
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*axes.values())]
+
+
+def random_sample(n, seed=None, **ranges):
+    """`n` random override dicts.
+
+    Each range is either a `(low, high)` tuple, sampled uniformly (as an
+    integer when both bounds are ints), or a list of choices.
+    """
+    rng = np.random.default_rng(seed)
+    points = []
+    for _ in range(n):
+        point = {}
+        for name, spec in ranges.items():
+            if isinstance(spec, tuple):
+                low, high = spec
+                if isinstance(low, int) and isinstance(high, int):
+                    point[name] = int(rng.integers(low, high + 1))
+                else:
+                    point[name] = float(rng.uniform(low, high))
+            else:
+                point[name] = spec[rng.integers(len(spec))]
+        points.append(point)
+    return points
+
+
+def run_point(config):
+    try:
+        return summary_metrics(simulate(config), config.fee_rate)
+    except ValueError as e:
+        return {"error": str(e)}
+
+
+def run_sweep(points, base=None, cache_dir=DEFAULT_CACHE_DIR, max_workers=None, on_progress=None):
+    """Run every override dict in `points` on top of `base` and return a tidy table.
+
+    Unseeded points run with seed 0 so that every point sees the same
+    random stream and differences come from the parameters. Points whose
+    config is already in `cache_dir` are read back instead of re-run;
+    pass `cache_dir=None` to disable the cache.
+    """
+    base = base or SimulationConfig()
+    if base.seed is None:
+        base = replace(base, seed=0)
+    configs = [replace(base, **point) for point in points]
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else None
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    rows = [None] * len(configs)
+    pending = []
+    for i, config in enumerate(configs):
+        cached = cache_dir / f"{config_key(config)}.json" if cache_dir is not None else None
+        if cached is not None and cached.exists():
+            rows[i] = json.loads(cached.read_text())
+        else:
+            pending.append(i)
+
+    def store(i, metrics):
+        metrics = {k: np.asarray(v).item() for k, v in metrics.items()}
+        rows[i] = metrics
+        if cache_dir is not None:
+            (cache_dir / f"{config_key(configs[i])}.json").write_text(json.dumps(metrics))
+        if on_progress is not None:
+            on_progress(sum(row is not None for row in rows) / len(rows))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(pending) <= 1:
+        for i in pending:
+            store(i, run_point(configs[i]))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            for i, metrics in zip(pending, pool.map(run_point, [configs[i] for i in pending])):
+                store(i, metrics)
+
+    table = pd.DataFrame([asdict(config) for config in configs]).drop(columns=["debug", "backend"])
+    table["cached"] = [i not in pending for i in range(len(configs))]
+    return pd.concat([table, pd.DataFrame(rows)], axis=1)
+
+
+def rank(table, by="total_fees", ascending=False):
+    return table.sort_values(by, ascending=ascending).reset_index(drop=True)
+
+
+def _parse_axis(spec):
+    name, _, values = spec.partition("=")
+    if name not in CONFIG_FIELDS:
+        raise argparse.ArgumentTypeError(f"Unknown parameter {name!r}; choose from {', '.join(CONFIG_FIELDS)}")
+    cast = float if "float" in str(CONFIG_FIELDS[name]) else int
+    return name, [cast(v) for v in values.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep Stakesim tokenomics parameters.")
+    parser.add_argument("--grid", nargs="+", type=_parse_axis, required=True, metavar="NAME=V1,V2",
+                        help="parameter axes; the sweep runs their cartesian product")
+    parser.add_argument("--days", type=int, default=SimulationConfig.sim_days)
+    parser.add_argument("--users-per-day", type=int, default=SimulationConfig.users_per_day)
+    parser.add_argument("--transaction-prob", type=float, default=SimulationConfig.transaction_prob)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default=str(DEFAULT_CACHE_DIR))
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--rank", default="total_fees", help="metric column to sort the results by")
+    parser.add_argument("--out", default="sweep.csv")
+    args = parser.parse_args(argv)
+
+    base = SimulationConfig(args.days, args.users_per_day, args.transaction_prob, seed=args.seed)
+    table = run_sweep(
+        grid(**dict(args.grid)),
+        base=base,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        max_workers=args.workers,
+    )
+    table = rank(table, args.rank)
+    table.to_csv(args.out, index=False)
+    print(table.head(10).to_string(index=False))
+    print(f"Wrote {len(table)} rows ({table['cached'].sum()} from cache) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
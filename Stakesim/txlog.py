@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+# Categorical codes stored in the logs; the lists double as the labels.
+ACTIONS = ["buy", "sell", "churn_sell"]
+BUY, SELL, CHURN_SELL = range(len(ACTIONS))
+
+FAIL_REASONS = ["insufficient funds", "supply constraint", "whale constraint"]
+INSUFFICIENT_FUNDS, SUPPLY_CONSTRAINT, WHALE_CONSTRAINT = range(len(FAIL_REASONS))
+
+TX_SCHEMA = [
+    ("Day", np.int32),
+    ("User", np.int32),
+    ("Action", np.int8),
+    ("Team", np.int16),
+    ("Quantity", np.int32),
+    ("Fee", np.float64),
+    ("Nominal Value", np.float64),
+]
+FAILED_TX_SCHEMA = [
+    ("Day", np.int32),
+    ("User", np.int32),
+    ("Action", np.int8),
+    ("Team", np.int16),
+    ("Quantity", np.int32),
+    ("Reason", np.int8),
+]
+
+
+class ColumnarLog:
+    """Append-only table held as one growable NumPy array per column.
+
+    Rows are appended as positional values matching `schema`; ids and
+    codes stay integers until `to_frame` attaches their labels.
+    """
+
+    def __init__(self, schema, capacity=1024):
+        self.columns = [name for name, _ in schema]
+        self._arrays = [np.empty(max(capacity, 1), dtype=dtype) for _, dtype in schema]
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, *row):
+        if self._size == len(self._arrays[0]):
+            self._arrays = [np.concatenate([a, np.empty_like(a)]) for a in self._arrays]
+        i = self._size
+        for array, value in zip(self._arrays, row):
+            array[i] = value
+        self._size += 1
+
+    def extend(self, *columns):
+        """Append many rows at once, given as one equal-length array per column."""
+        n = len(columns[0])
+        needed = self._size + n
+        if needed > len(self._arrays[0]):
+            capacity = max(needed, 2 * len(self._arrays[0]))
+            grown = []
+            for a in self._arrays:
+                g = np.empty(capacity, dtype=a.dtype)
+                g[:self._size] = a[:self._size]
+                grown.append(g)
+            self._arrays = grown
+        for array, values in zip(self._arrays, columns):
+            array[self._size:needed] = values
+        self._size = needed
+
+    def column(self, name):
+        return self._arrays[self.columns.index(name)][:self._size]
+
+    @property
+    def nbytes(self):
+        return sum(a[:self._size].nbytes for a in self._arrays)
+
+    def to_frame(self, categories, start=0):
+        """Build a DataFrame of rows `start:`, turning the columns in `categories` (name -> labels) into Categoricals."""
+        data = {}
+        for name, array in zip(self.columns, self._arrays):
+            values = array[start:self._size]
+            if name in categories:
+                data[name] = pd.Categorical.from_codes(values, categories=categories[name])
+            else:
+                data[name] = values.copy()
+        return pd.DataFrame(data, columns=self.columns)
+
+
+class NullLog(ColumnarLog):
+    """Log with the same interface that discards rows, for runs too large to keep them."""
+
+    def __init__(self, schema, capacity=0):
+        super().__init__(schema, capacity=0)
+
+    def append(self, *row):
+        pass
+
+    def extend(self, *columns):
+        pass
@@ -6,10 +6,10 @@ def show_simulation_summary(results):
     col1, _ = st.columns([1, 1])  # 1/3 width chart
     with col1:
         st.markdown("**Transaction Log**")
-        st.dataframe(pd.DataFrame(results["tx_log"], columns=["Day", "User", "Action", "Team", "Quantity", "Fee", "Nominal Value"]))
+        st.dataframe(results["tx_log"])
     
         st.markdown("**Failed Transactions**")
-        st.dataframe(pd.DataFrame(results["failed_tx_log"], columns=["Day", "User", "Action", "Team", "Quantity", "Reason"]))
+        st.dataframe(results["failed_tx_log"])
     
     
         st.markdown("**LP Contributions**")
@@ -44,6 +44,22 @@ def show_mcap(results):
         container.line_chart(results['mcap_df'].set_index("Day"))
         
 
+def show_live_charts(teams):
+    """Empty market cap and price charts for `add_live_snapshot` to extend as days complete."""
+    col1, _ = st.columns([1, 1])  # 1/3 width chart
+
+    with col1:
+        st.markdown("**Mcap vs Reserve pool**")
+        mcap_chart = st.container(border = True).line_chart(pd.DataFrame(columns=["Market Cap", "Global Reserve"], dtype=float))
+        st.markdown("**All token prices**")
+        price_chart = st.container(border = True).line_chart(pd.DataFrame(columns=teams, dtype=float))
+    return mcap_chart, price_chart
+
+def add_live_snapshot(charts, snapshot):
+    mcap_chart, price_chart = charts
+    mcap_chart.add_rows(pd.DataFrame({"Market Cap": [snapshot.market_cap], "Global Reserve": [snapshot.global_reserve]}, index=[snapshot.day]))
+    price_chart.add_rows(snapshot.prices.to_frame(snapshot.day).T)
+
 def show_available_supply_chart(results, token):
     col1, _ = st.columns([1, 1])  # 1/3 width chart
    
@@ -58,14 +74,14 @@ def visualize_price_with_volume(results, token):
     #st.subheader("📊 Token Price vs Trade Volume")
 
     price_df = results["price_df"]
-    tx_df = pd.DataFrame(results["tx_log"], columns=["Day", "User", "Action", "Team", "Quantity", "Fee", "Nominal Value"])
+    tx_df = results["tx_log"]
 
 
     # Filter transactions for selected team
     team_tx = tx_df[tx_df["Team"] == token]
 
     # Group volume by day and action
-    daily_volume = team_tx.groupby(["Day", "Action"])["Quantity"].sum().unstack(fill_value=0)
+    daily_volume = team_tx.groupby(["Day", "Action"], observed=True)["Quantity"].sum().unstack(fill_value=0)
 
     # Align with price data
     daily_price = price_df[token]
@@ -145,3 +161,43 @@ def show_all_prices_chart(results):
     with col1:
         container = st.container(border = True)
         container.plotly_chart(fig, use_container_width=False)
+
+def show_ensemble_summary(ensemble):
+    col1, _ = st.columns([1, 1])  # 1/3 width chart
+
+    with col1:
+        st.markdown(f"**Monte Carlo summary ({len(ensemble.seeds)} replicas)**")
+        st.dataframe(ensemble.summary.style.format("{:,.2f}"))
+
+def show_ensemble_fan_chart(ensemble, series="market_cap", title="Market cap"):
+    fan = ensemble.fan(series)
+
+    fig = go.Figure()
+    # Outer band first so the inner band is drawn on top of it
+    for low, high, opacity in [("p5", "p95", 0.2), ("p25", "p75", 0.35)]:
+        fig.add_trace(go.Scatter(
+            x=fan.index, y=fan[high], mode="lines", line=dict(width=0),
+            showlegend=False, hoverinfo="skip"
+        ))
+        fig.add_trace(go.Scatter(
+            x=fan.index, y=fan[low], mode="lines", line=dict(width=0),
+            fill="tonexty", fillcolor=f"rgba(31, 119, 180, {opacity})",
+            name=f"{low}-{high}"
+        ))
+    fig.add_trace(go.Scatter(
+        x=fan.index, y=fan["p50"], mode="lines", name="Median",
+        line=dict(width=3, color="rgb(31, 119, 180)")
+    ))
+
+    fig.update_layout(
+        title=f"{title} across replicas",
+        xaxis_title="Day",
+        yaxis_title="USD",
+        height=400
+    )
+
+    col1, _ = st.columns([1, 1])  # 1/3 width chart
+
+    with col1:
+        container = st.container(border = True)
+        container.plotly_chart(fig, use_container_width=True)
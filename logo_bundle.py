@@ -0,0 +1,99 @@
+"""Team logos precomputed into one bundle of ready-to-serve data URIs.
+
+The 500x500 source PNGs in images/ are downsized and recompressed once
+into .logo_bundle.json. At startup that file is read in a single
+call and its data URIs go straight into the market table, with no
+per-logo decode or re-encode; only each source's size and mtime are
+checked to see whether the bundle is still current.
+
+Run `python logo_bundle.py` to (re)build the bundle.
+"""
+import base64
+import json
+import sys
+from io import BytesIO
+from pathlib import Path
+
+try:
+    from PIL import Image
+except ImportError:  # optional; without Pillow the logos are bundled as-is
+    Image = None
+
+LOGO_DIR = Path(__file__).resolve().parent / "images"
+BUNDLE_PATH = Path(__file__).resolve().parent / ".logo_bundle.json"
+# Twice the largest size a logo is shown at (65 px on the Tokens tab), for high-DPI screens.
+LOGO_SIZE = 130
+BUNDLE_VERSION = 2
+
+
+def _compressed_png(path, size):
+    if Image is None:
+        return path.read_bytes()
+    with Image.open(path) as img:
+        img.thumbnail((size, size), Image.LANCZOS)
+        with BytesIO() as buffer:
+            img.save(buffer, "png", optimize=True)
+            return buffer.getvalue()
+
+
+def _sources(count, logo_dir):
+    # (size, mtime in ns) of every bundled logo; replacing a file in place changes its entry.
+    sources = []
+    for i in range(count):
+        source = Path(logo_dir) / f"logo_{i}.png"
+        if not source.exists():
+            raise FileNotFoundError(f"Logo not found: {source}")
+        stat = source.stat()
+        sources.append([stat.st_size, stat.st_mtime_ns])
+    return sources
+
+
+def logo_fingerprint(count, logo_dir=LOGO_DIR):
+    """Hashable (size, mtime) of the first `count` logos, for keying caches of `load_bundle`."""
+    return tuple(map(tuple, _sources(count, logo_dir)))
+
+
+def build_bundle(count, logo_dir=LOGO_DIR, path=BUNDLE_PATH, size=LOGO_SIZE):
+    """Bundle `logo_{0..count-1}.png` from `logo_dir` into `path`; returns the list of data URIs."""
+    logo_dir = Path(logo_dir)
+    sources = _sources(count, logo_dir)
+    uris = []
+    for i in range(count):
+        source = logo_dir / f"logo_{i}.png"
+        uris.append(f"data:image/png;base64,{base64.b64encode(_compressed_png(source, size)).decode()}")
+    bundle = {
+        "version": BUNDLE_VERSION,
+        "size": size if Image is not None else None,
+        "sources": sources,
+        "logos": uris,
+    }
+    Path(path).write_text(json.dumps(bundle))
+    return uris
+
+
+def load_bundle(count, logo_dir=LOGO_DIR, path=BUNDLE_PATH):
+    """Data URIs of the first `count` logos, from the bundle when it is current, else after rebuilding it."""
+    path = Path(path)
+    if path.exists():
+        bundle = json.loads(path.read_text())
+        if (
+            bundle.get("version") == BUNDLE_VERSION
+            and len(bundle["logos"]) >= count
+            and bundle["sources"][:count] == _sources(count, logo_dir)
+        ):
+            return bundle["logos"][:count]
+    return build_bundle(count, logo_dir, path)
+
+
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    count = int(args[0]) if args else len(list(LOGO_DIR.glob("logo_*.png")))
+    uris = build_bundle(count)
+    sources = sum((LOGO_DIR / f"logo_{i}.png").stat().st_size for i in range(count))
+    payload = sum(len(uri) for uri in uris)
+    print(f"Bundled {count} logos into {BUNDLE_PATH}: {payload / 2**10:,.0f} KiB of data URIs "
+          f"from {sources / 2**10:,.0f} KiB of source PNGs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,362 @@
+"""Historical token price model behind Stakeholder_data/prices.csv and yield.csv.
+
+Prices blend the team's 42-day and 1092-day average AP votes (as shares
+of the 21-day average vote total) with its conference's 364-day
+per-team share into a base price. A random walk is then
+re-anchored towards that base every few days. Everything is computed for
+all teams at once as (days x teams) arrays.
+
+Run `python prices.py` to regenerate prices.csv and yield.csv, or
+`python prices.py --update` to append only the days added to the votes
+table since the last run.
+"""
+import json
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
 import pandas as pd
 
-def get_team_prices(team, conference, vol=0.05, reanchor_interval=7, alpha=0.2, seed = 1234):
+from stakeholder_data import DATA_DIR, load_table
+
+STATE_PATH = DATA_DIR / "price_model_state.npz"
+
+# 4% of the 13,400 reserve pool, paid out across teams by vote share.
+ANNUAL_PAYOUT = 536
+ANNUAL_YIELD = 0.039
+WEEK_WINDOW = 42
+YEAR_WINDOW = 1092
+TOTAL_VOTES_WINDOW = 21
+CONFERENCE_WINDOW = 364
+
+
+class ConferenceShares(NamedTuple):
+    shares: pd.DataFrame          # date x conference: per-team conference share
+    rolling: pd.DataFrame         # its 364-day rolling mean
+    team_conference: np.ndarray   # column of `rolling` for each team, in teams.csv order
+
+
+class PriceInputs(NamedTuple):
+    daily: pd.DataFrame              # Daily_AP_Votes_Data.csv: one row per day, one vote column per team
+    teams: pd.DataFrame              # teams.csv
+    conference: ConferenceShares
+
+
+def pivot_conference_shares(conference, teams):
+    """Pivot the long-format conference table into a date-indexed matrix with its rolling means.
+
+    Done once per load; per-team conference prices are then a column
+    gather through `team_conference`.
+    """
+    shares = conference.pivot(index="Date", columns="Conference", values="Conference_Share_Per_Team")
+    shares.index = pd.to_datetime(shares.index)
+    shares = shares.sort_index()
+    rolling = shares.rolling(window=CONFERENCE_WINDOW, min_periods=1).mean()
+    team_conference = rolling.columns.get_indexer(teams["Conference"])
+    if (team_conference < 0).any():
+        unknown = sorted(set(teams["Conference"][team_conference < 0]))
+        raise ValueError(f"No conference share data for: {', '.join(unknown)}")
+    return ConferenceShares(shares, rolling, team_conference)
+
+
+def load_inputs(data_dir=DATA_DIR):
+    teams = load_table("teams", data_dir)
+    return PriceInputs(
+        daily=load_table("Daily_AP_Votes_Data", data_dir),
+        teams=teams,
+        conference=pivot_conference_shares(load_table("Conference_Share_Per_Team_Per_Day", data_dir), teams),
+    )
+
+
+def team_names(inputs):
+    """Price column names: the lower-cased schools of teams.csv, in file order."""
+    return inputs.teams["School"].str.lower().tolist()
+
+
+def _votes(inputs):
+    # Teams that never received a vote have no column in the votes table.
+    return inputs.daily.reindex(columns=team_names(inputs), fill_value=0).to_numpy(dtype=np.float64)
+
+
+def _rolling_mean(values, window):
+    """Trailing mean over `window` rows along axis 0, NaN until the window is full."""
+    csum = np.cumsum(values, axis=0)
+    out = np.full(values.shape, np.nan)
+    if len(values) < window:
+        return out
+    out[window - 1] = csum[window - 1]
+    out[window:] = csum[window:] - csum[:-window]
+    return out / window
+
+
+def conference_prices(inputs, annual_payout=ANNUAL_PAYOUT):
+    """(days x teams) price implied by each team's conference share, aligned to the votes table by date.
+
+    Days missing from the conference data are NaN.
     """
-    Generate token prices for a team using conference data, rolling averages, and random walk with re-anchoring.
-
-    Parameters:
-    team (str): Team name.
-    conference (str): Conference name.
-    vol (float): Volatility for random walk.
-    reanchor_interval (int): Re-anchor interval in days.
-    alpha (float): Weight for base price during re-anchoring.
-    annual_payout (float): Annual payout value for scaling.
-
-    Returns:
-    pd.Series: Simulated random walk prices.
+    dates = pd.to_datetime(inputs.daily["Date"])
+    rolling = inputs.conference.rolling.reindex(dates).to_numpy()
+    return rolling[:, inputs.conference.team_conference] * annual_payout / 100 / ANNUAL_YIELD
+
+
+def base_prices(inputs, annual_payout=ANNUAL_PAYOUT):
+    """(days x teams) anchor prices; NaN until the longest rolling window is full."""
+    votes = _votes(inputs)
+    total_votes = _rolling_mean(inputs.daily["Total_Points"].to_numpy(dtype=np.float64), TOTAL_VOTES_WINDOW)
+    weekly_price = _rolling_mean(votes, WEEK_WINDOW) / total_votes[:, None] * annual_payout / 100 / ANNUAL_YIELD
+    yearly_price = _rolling_mean(votes, YEAR_WINDOW) / total_votes[:, None] * annual_payout / 100 / ANNUAL_YIELD
+    return yearly_price * 0.4 + weekly_price * 0.4 + conference_prices(inputs, annual_payout) * 0.2 + 0.1
+
+
+def reanchored_walk(base, changes, reanchor_interval=7, alpha=0.2, start=None):
+    """Random walk over `base` (days x teams) with multiplicative daily `changes`.
+
+    Every `reanchor_interval`-th day the walk is pulled towards the base
+    price: `alpha * base + (1 - alpha) * walk`. Between anchors the walk
+    is a cumulative product, so only the anchors are stepped one by one.
+    `start` is the value before the first day (the first base row by
+    default).
     """
-    # Filter conference data
-    np.random.seed(seed)
-
-    conf_idx = conference_df['Conference'] == conference
-    conf_df = conference_df[conf_idx]
-    
-    # Compute rolling averages for the conference
-    conf_year_avg = conf_df['Conference_Share_Per_Team'].rolling(window=364, min_periods=1).mean()
-    conf_share = (conf_year_avg) * annual_payout
-    conf_price = (conf_share / 100) / 0.039  # Assuming annual yield of 3.9%
-
-    # Compute rolling averages for the team
-    week_avg = daily_df[team].rolling(window=42, center = False).mean()
-    year_avg = daily_df[team].rolling(window=1092, center = False).mean()
-    total_votes = daily_df['Total_Points'].rolling(window=21, center = False).mean()
-    
-    # Compute weekly and yearly prices
-    weekly_share = (week_avg / total_votes) * annual_payout
-    weekly_price = (weekly_share / 100) / 0.039
-    yearly_share = (year_avg / total_votes) * annual_payout
-    yearly_price = (yearly_share / 100) / 0.039
-    
-    # Combine prices
-    price = (
-        (yearly_price * 0.4) +
-        (weekly_price * 0.4) +
-        (conf_price.reset_index(drop=True) * 0.2) +
-        0.1
-    ).dropna()  # Drop any NaN values from the combined series
-    
-    # Ensure price is not empty
-    if price.empty:
+    days = len(base)
+    walk = np.empty(base.shape)
+    level = base[0].copy() if start is None else np.asarray(start, dtype=np.float64).copy()
+    for block_start in range(0, days, reanchor_interval):
+        block_end = min(block_start + reanchor_interval, days)
+        # Seeding the product with the previous level keeps the same
+        # multiplication order as stepping day by day.
+        factors = np.vstack([level, 1 + changes[block_start:block_end]])
+        path = np.cumprod(factors, axis=0)[1:]
+        if block_end - block_start == reanchor_interval:
+            anchored = alpha * base[block_end - 1] + (1 - alpha) * path[-1]
+            path[-1] = np.where(np.isnan(base[block_end - 1]), path[-1], anchored)
+        np.maximum(path, 0, out=path)
+        walk[block_start:block_end] = path
+        level = path[-1]
+    return walk
+
+
+@dataclass
+class PriceModelState:
+    """Everything needed to extend a modeled series by more days without recomputing it.
+
+    Rolling windows are kept as running sums; the values leaving a window
+    are read back from the input tables, so each new day costs O(teams).
+    """
+    vol: float
+    reanchor_interval: int
+    alpha: float
+    annual_payout: float
+    rows: int                  # votes-table rows consumed
+    walk_days: int             # modeled days so far
+    week_sum: np.ndarray       # per-team votes over the last WEEK_WINDOW rows
+    year_sum: np.ndarray       # per-team votes over the last YEAR_WINDOW rows
+    total_sum: float           # Total_Points over the last TOTAL_VOTES_WINDOW rows
+    conference_rows: int       # conference-share dates consumed
+    conference_sum: np.ndarray  # per-conference share over the last CONFERENCE_WINDOW dates
+    conference_count: np.ndarray
+    level: np.ndarray          # last walk value per team
+    rng_state: dict
+
+    def save(self, path=STATE_PATH):
+        arrays = {name: getattr(self, name) for name in
+                  ("week_sum", "year_sum", "conference_sum", "conference_count", "level")}
+        meta = {name: value for name, value in asdict(self).items() if name not in arrays}
+        np.savez(path, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(data["meta"].item())
+            return cls(**meta, **{name: data[name] for name in data.files if name != "meta"})
+
+
+def build_model(inputs, vol=0.05, reanchor_interval=7, alpha=0.2, seed=1234, annual_payout=ANNUAL_PAYOUT,
+                allow_empty=False):
+    """Model the full history: returns (prices, yields, state).
+
+    Rows are the days on which every rolling window is full, indexed by
+    their row in the votes table; columns are `team_names(inputs)`. Pass
+    `state` to `extend_model` to add later days. A table too short to
+    model any day raises ValueError, unless `allow_empty`, in which case
+    the series are empty and the walk starts once `extend_model` reaches
+    the first full day.
+    """
+    teams = team_names(inputs)
+    base = base_prices(inputs, annual_payout)
+    valid = np.flatnonzero(np.isfinite(base).all(axis=1))
+    if valid.size == 0 and not allow_empty:
         raise ValueError("The calculated price series is empty. Check input data.")
-    
-    # Initialize random walk
-    random_changes = np.random.uniform(-vol, vol, len(price))
-    random_walk_prices = [price.iloc[0]]
-
-    # Apply random walk with re-anchoring
-    for i, change in enumerate(random_changes):
-        next_price = random_walk_prices[-1] * (1 + change)
-        if (i + 1) % reanchor_interval == 0:
-            # Smooth re-anchor to the base price
-            base_price = price.iloc[i]
-            if not np.isnan(base_price):
-                new_price = alpha * base_price + (1 - alpha) * next_price
-            else:
-                new_price = next_price  # Skip re-anchoring if base price is NaN
-        else:
-            new_price = next_price
-        
-        random_walk_prices.append(max(new_price, 0))  # Ensure price stays non-negative
-    
-    modeled_prices = pd.Series(random_walk_prices[1:], index=price.index)
-    
-    full_df = pd.DataFrame()
-    full_df['Date'] = pd.to_datetime(daily_df['Date'])
-    full_df['Price'] = modeled_prices
-    full_df['Payout'] = (daily_df[team]/daily_df['Total_Points']*annual_payout)/100
-    # Return as a Pandas Series aligned with the price index
-    return full_df.dropna(how='any')
+    base = base[valid]
+
+    rng = np.random.default_rng(seed)
+    changes = rng.uniform(-vol, vol, base.shape)
+    walk = reanchored_walk(base, changes, reanchor_interval, alpha) if valid.size else np.empty(base.shape)
+
+    votes = _votes(inputs)
+    total_points = inputs.daily["Total_Points"].to_numpy(dtype=np.float64)
+    payout = votes[valid] / total_points[valid, None] * annual_payout / 100
+    index = pd.Index(valid)
+
+    conference = inputs.conference.shares
+    conference_rows = int(np.searchsorted(conference.index, pd.to_datetime(inputs.daily["Date"].iloc[-1]), "right"))
+    window = conference.iloc[max(conference_rows - CONFERENCE_WINDOW, 0):conference_rows].to_numpy()
+    state = PriceModelState(
+        vol=vol,
+        reanchor_interval=reanchor_interval,
+        alpha=alpha,
+        annual_payout=annual_payout,
+        rows=len(votes),
+        walk_days=len(valid),
+        week_sum=votes[-WEEK_WINDOW:].sum(axis=0),
+        year_sum=votes[-YEAR_WINDOW:].sum(axis=0),
+        total_sum=float(total_points[-TOTAL_VOTES_WINDOW:].sum()),
+        conference_rows=conference_rows,
+        conference_sum=np.nansum(window, axis=0),
+        conference_count=np.count_nonzero(~np.isnan(window), axis=0).astype(np.float64),
+        level=walk[-1].copy() if valid.size else np.full(len(teams), np.nan),
+        rng_state=rng.bit_generator.state,
+    )
+    return (
+        pd.DataFrame(walk, index=index, columns=teams),
+        pd.DataFrame(payout, index=index, columns=teams),
+        state,
+    )
+
+
+def model_prices(inputs, **params):
+    """Modeled prices and daily yields for every team, as (prices, yields) DataFrames."""
+    prices, yields, _ = build_model(inputs, **params)
+    return prices, yields
+
+
+def extend_model(inputs, state):
+    """Model the votes-table rows added since `state` was taken.
+
+    Returns (prices, yields) for just the new days and advances `state`
+    in place. Continues the same random stream, so the result matches a
+    full rebuild up to floating-point rounding in the conference means.
+    """
+    daily = inputs.daily
+    new_rows = np.arange(state.rows, len(daily))
+    teams = team_names(inputs)
+    if new_rows.size == 0:
+        empty = pd.DataFrame(columns=teams, dtype=np.float64)
+        return empty, empty.copy()
+
+    # Only the entering rows and the rows leaving each window are read.
+    needed = np.unique(np.concatenate([
+        new_rows,
+        new_rows[new_rows >= WEEK_WINDOW] - WEEK_WINDOW,
+        new_rows[new_rows >= YEAR_WINDOW] - YEAR_WINDOW,
+        new_rows[new_rows >= TOTAL_VOTES_WINDOW] - TOTAL_VOTES_WINDOW,
+    ]))
+    position = np.full(len(daily), -1)
+    position[needed] = np.arange(needed.size)
+    subset = daily.iloc[needed]
+    votes = subset.reindex(columns=teams, fill_value=0).to_numpy(dtype=np.float64)
+    total_points = subset["Total_Points"].to_numpy(dtype=np.float64)
+    dates = pd.to_datetime(subset["Date"])
+
+    conference = inputs.conference
+    shares = conference.shares.to_numpy()
+    share_dates = conference.shares.index
+    rng = np.random.default_rng()
+    rng.bit_generator.state = state.rng_state
+
+    index, walk_rows, payout_rows = [], [], []
+    for row in new_rows:
+        at = position[row]
+        state.week_sum += votes[at] - (votes[position[row - WEEK_WINDOW]] if row >= WEEK_WINDOW else 0)
+        state.year_sum += votes[at] - (votes[position[row - YEAR_WINDOW]] if row >= YEAR_WINDOW else 0)
+        state.total_sum += total_points[at] - (
+            total_points[position[row - TOTAL_VOTES_WINDOW]] if row >= TOTAL_VOTES_WINDOW else 0
+        )
+        state.rows = row + 1
+
+        date = dates.iloc[at]
+        conference_rows = int(np.searchsorted(share_dates, date, "right"))
+        for r in range(state.conference_rows, conference_rows):
+            entering = shares[r]
+            state.conference_sum += np.nan_to_num(entering)
+            state.conference_count += ~np.isnan(entering)
+            if r >= CONFERENCE_WINDOW:
+                leaving = shares[r - CONFERENCE_WINDOW]
+                state.conference_sum -= np.nan_to_num(leaving)
+                state.conference_count -= ~np.isnan(leaving)
+        state.conference_rows = max(state.conference_rows, conference_rows)
+        if row + 1 < max(WEEK_WINDOW, YEAR_WINDOW, TOTAL_VOTES_WINDOW):
+            continue
+        if conference_rows == 0 or share_dates[conference_rows - 1] != date:
+            continue  # no conference data for this day
+
+        # Same operation order as `base_prices`, so integer vote counts give identical prices.
+        total_votes = state.total_sum / TOTAL_VOTES_WINDOW
+        weekly_price = state.week_sum / WEEK_WINDOW / total_votes * state.annual_payout / 100 / ANNUAL_YIELD
+        yearly_price = state.year_sum / YEAR_WINDOW / total_votes * state.annual_payout / 100 / ANNUAL_YIELD
+        with np.errstate(invalid="ignore", divide="ignore"):
+            conference_mean = state.conference_sum / state.conference_count
+        conference_price = conference_mean[conference.team_conference] * state.annual_payout / 100 / ANNUAL_YIELD
+        base = yearly_price * 0.4 + weekly_price * 0.4 + conference_price * 0.2 + 0.1
+        if not np.isfinite(base).all():
+            continue
+
+        level = base if state.walk_days == 0 else state.level
+        level = level * (1 + rng.uniform(-state.vol, state.vol, len(teams)))
+        state.walk_days += 1
+        if state.walk_days % state.reanchor_interval == 0:
+            level = state.alpha * base + (1 - state.alpha) * level
+        state.level = np.maximum(level, 0)
+
+        index.append(row)
+        walk_rows.append(state.level)
+        payout_rows.append(votes[at] / total_points[at] * state.annual_payout / 100)
+
+    state.rng_state = rng.bit_generator.state
+    index = pd.Index(index, dtype=np.int64)
+    return (
+        pd.DataFrame(np.reshape(walk_rows, (-1, len(teams))), index=index, columns=teams),
+        pd.DataFrame(np.reshape(payout_rows, (-1, len(teams))), index=index, columns=teams),
+    )
+
+
+def get_team_prices(team, inputs=None, **params):
+    """Date, Price and Payout for one team (lower-cased school name)."""
+    inputs = inputs if inputs is not None else load_inputs()
+    prices, yields = model_prices(inputs, **params)
+    return pd.DataFrame({
+        "Date": pd.to_datetime(inputs.daily["Date"].iloc[prices.index]).to_numpy(),
+        "Price": prices[team].to_numpy(),
+        "Payout": yields[team].to_numpy(),
+    }, index=prices.index)
+
 
+def main(argv=None):
+    args = sys.argv[1:] if argv is None else argv
+    update = "--update" in args
+    args = [arg for arg in args if arg != "--update"]
+    out_dir = Path(args[0]) if args else DATA_DIR
+    state_path = out_dir / STATE_PATH.name
+    start = time.perf_counter()
+    inputs = load_inputs()
+    if update and state_path.exists():
+        state = PriceModelState.load(state_path)
+        prices, yields = extend_model(inputs, state)
+        elapsed = time.perf_counter() - start
+        prices.to_csv(out_dir / "prices.csv", mode="a", header=False)
+        yields.to_csv(out_dir / "yield.csv", mode="a", header=False)
+        state.save(state_path)
+        print(f"Appended {prices.shape[0]} days x {prices.shape[1]} teams in {elapsed * 1e3:.0f} ms; wrote {out_dir}")
+        return
+    prices, yields, state = build_model(inputs, allow_empty=update)
+    elapsed = time.perf_counter() - start
+    prices.to_csv(out_dir / "prices.csv")
+    yields.to_csv(out_dir / "yield.csv")
+    state.save(state_path)
+    print(f"Modeled {prices.shape[0]} days x {prices.shape[1]} teams in {elapsed * 1e3:.0f} ms; wrote {out_dir}")
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Sparkline PNGs for the market table, rasterized directly with NumPy.
+
+A sparkline is a single anti-aliased polyline on a white background, so
+it is drawn straight into a pixel array and encoded as PNG with zlib
+instead of going through a Plotly figure and Kaleido. Rendered images
+are cached on disk under a key of team, color, window, size and a hash
+of the plotted values, so only teams whose price tail changed are drawn
+again.
+"""
+import base64
+import hashlib
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".sparkline_cache"
+# Bump when the drawing changes so cached images are redrawn.
+RENDER_VERSION = 1
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encode_png(rgb):
+    """Encode an (height, width, 3) uint8 array as PNG bytes."""
+    height, width, _ = rgb.shape
+    # Filter type 0 (none) in front of every scanline.
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgb.reshape(height, -1)], axis=1)
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+        _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), 9)),
+        _png_chunk(b"IEND", b""),
+    ])
+
+
+def _hex_rgb(color):
+    color = color.lstrip("#")
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    return np.array([int(color[i:i + 2], 16) for i in (0, 2, 4)], dtype=np.float64)
+
+
+def render_sparkline(values, color, height=50, width=110, margin=10, line_width=2, scale=4):
+    """Draw `values` as a `color` line inside a white `width` x `height` image; returns PNG bytes.
+
+    The line is drawn on a `scale`-times supersampled grid and averaged
+    down, which anti-aliases it.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    big_w, big_h = width * scale, height * scale
+    left, right = margin * scale, (width - margin) * scale - 1
+    top, bottom = margin * scale, (height - margin) * scale - 1
+
+    coverage = np.zeros((big_h, big_w), dtype=bool)
+    if values.size:
+        low, high = values.min(), values.max()
+        span = high - low
+        xs = np.linspace(left, right, values.size) if values.size > 1 else np.array([(left + right) / 2])
+        ys = bottom - (values - low) / span * (bottom - top) if span > 0 else np.full(values.size, (top + bottom) / 2)
+
+        # Sample every segment at least once per supersampled pixel.
+        steps = np.maximum(np.ceil(np.maximum(np.abs(np.diff(xs)), np.abs(np.diff(ys)))).astype(np.int64), 1)
+        segment = np.repeat(np.arange(steps.size), steps)
+        t = (np.arange(segment.size) - np.repeat(np.cumsum(steps) - steps, steps)) / np.repeat(steps, steps)
+        px = np.append(xs[segment] + t * np.diff(xs)[segment], xs[-1]) if steps.size else xs
+        py = np.append(ys[segment] + t * np.diff(ys)[segment], ys[-1]) if steps.size else ys
+        coverage[np.rint(py).astype(np.int64), np.rint(px).astype(np.int64)] = True
+
+        # Thicken to the line width with a disk-shaped dilation.
+        radius = line_width * scale / 2
+        reach = int(np.ceil(radius))
+        core = coverage.copy()
+        for dy in range(-reach, reach + 1):
+            for dx in range(-reach, reach + 1):
+                if (dx == 0 and dy == 0) or dx * dx + dy * dy > radius * radius:
+                    continue
+                coverage[max(dy, 0):big_h + min(dy, 0), max(dx, 0):big_w + min(dx, 0)] |= (
+                    core[max(-dy, 0):big_h + min(-dy, 0), max(-dx, 0):big_w + min(-dx, 0)]
+                )
+
+    alpha = coverage.reshape(height, scale, width, scale).mean(axis=(1, 3))[..., None]
+    rgb = 255 * (1 - alpha) + _hex_rgb(color) * alpha
+    return encode_png(np.rint(rgb).astype(np.uint8))
+
+
+def to_data_uri(png):
+    return f"data:image/png;base64,{base64.b64encode(png).decode()}"
+
+
+def sparkline_key(team, color, days, values, height, width):
+    digest = hashlib.sha256(np.ascontiguousarray(values, dtype=np.float64).tobytes()).hexdigest()[:16]
+    label = f"{RENDER_VERSION}|{team}|{color}|{days}|{width}x{height}|{digest}"
+    return hashlib.sha256(label.encode()).hexdigest()[:24]
+
+
+def render_sparklines(series, colors, days=364, height=50, width=110, cache_dir=DEFAULT_CACHE_DIR):
+    """Data URIs of the last `days` values of every column of `series`, drawn in the matching `colors`.
+
+    `series` is a DataFrame with one column per team and `colors` maps
+    the same team names to hex colors. Images already in `cache_dir` are
+    read back; pass `cache_dir=None` to always draw.
+    """
+    cache_dir = Path(cache_dir) if cache_dir is not None else None
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    uris = {}
+    for team in series.columns:
+        values = series[team].to_numpy()[-days:]
+        color = colors[team]
+        path = cache_dir / f"{sparkline_key(team, color, days, values, height, width)}.png" if cache_dir else None
+        if path is not None and path.exists():
+            png = path.read_bytes()
+        else:
+            png = render_sparkline(values, color, height=height, width=width)
+            if path is not None:
+                path.write_bytes(png)
+        uris[team] = to_data_uri(png)
+    return uris
@@ -0,0 +1,166 @@
+"""Cached access to the CSV tables in Stakeholder_data/.
+
+Each CSV is converted once into a binary cache next to it: numeric and
+boolean columns become one memory-mapped .npy block per dtype, and the
+remaining (string/mixed) columns a small pickle. The cache is rebuilt
+when the source's size or mtime changes and its content hash differs.
+Data files are named after the source's content hash and the metadata
+is replaced atomically, so a rebuild never touches files that frames
+loaded earlier still have mapped.
+
+Run `python stakeholder_data.py` to build every cache and compare load
+times against parsing the CSVs.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = Path(__file__).resolve().parent / "Stakeholder_data"
+# Bump when the cache layout changes so stale caches are rebuilt.
+CACHE_VERSION = 2
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomically(path, write):
+    # Write-then-rename so a concurrent reader never sees a partial file.
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _data_prefix(stem, digest):
+    return f"{stem}.{digest[:16]}"
+
+
+def fingerprint(path):
+    """Cheap change marker for a source file: (size, mtime in ns)."""
+    stat = Path(path).stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _write_cache(df, source, cache_dir):
+    stem = source.stem
+    blocks = {}
+    other = []
+    for name, dtype in df.dtypes.items():
+        if isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+            blocks.setdefault(dtype.str, []).append(name)
+        else:
+            other.append(name)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    size, mtime = fingerprint(source)
+    digest = _sha256(source)
+    prefix = _data_prefix(stem, digest)
+    written = set()
+    for code, names in blocks.items():
+        # One row per column, so each column is contiguous in the mapped file.
+        path = cache_dir / f"{prefix}.{code.lstrip('<>|=')}.npy"
+        _write_atomically(path, lambda f: np.save(f, df[names].to_numpy().T))
+        written.add(path.name)
+    if other:
+        path = cache_dir / f"{prefix}.other.pkl"
+        _write_atomically(path, lambda f: df[other].to_pickle(f))
+        written.add(path.name)
+
+    meta = {
+        "version": CACHE_VERSION,
+        "size": size,
+        "mtime_ns": mtime,
+        "sha256": digest,
+        "rows": len(df),
+        "columns": list(df.columns),
+        "blocks": {code.lstrip("<>|="): names for code, names in blocks.items()},
+        "other": other,
+    }
+    _write_atomically(cache_dir / f"{stem}.json", lambda f: f.write(json.dumps(meta).encode()))
+
+    # Data of earlier versions of the source; mapped views of it stay valid after the unlink.
+    for path in [*cache_dir.glob(f"{stem}.*.npy"), *cache_dir.glob(f"{stem}.*.pkl")]:
+        if path.name not in written:
+            try:
+                path.unlink()
+            except OSError:  # still open where unlinking is not allowed; left for the next rebuild
+                pass
+    return meta
+
+
+def _read_cache(meta, stem, cache_dir):
+    prefix = _data_prefix(stem, meta["sha256"])
+    columns = {}
+    for code, names in meta["blocks"].items():
+        block = np.load(cache_dir / f"{prefix}.{code}.npy", mmap_mode="r")
+        for name, values in zip(names, block):
+            columns[name] = np.asarray(values)  # plain ndarray view of the mapped row
+    if meta["other"]:
+        other = pd.read_pickle(cache_dir / f"{prefix}.other.pkl")
+        for name in meta["other"]:
+            columns[name] = other[name].array
+    return pd.DataFrame(columns, columns=meta["columns"], index=pd.RangeIndex(meta["rows"]), copy=False)
+
+
+def _current_meta(source, cache_dir):
+    meta_path = cache_dir / f"{source.stem}.json"
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text())
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    if (meta["size"], meta["mtime_ns"]) == fingerprint(source):
+        return meta
+    # Touched but possibly unchanged (e.g. a fresh checkout): compare contents.
+    if meta["size"] == source.stat().st_size and meta["sha256"] == _sha256(source):
+        meta["mtime_ns"] = fingerprint(source)[1]
+        _write_atomically(meta_path, lambda f: f.write(json.dumps(meta).encode()))
+        return meta
+    return None
+
+
+def load_table(name, data_dir=DATA_DIR, cache_dir=None):
+    """`pd.read_csv` of `data_dir/<name>.csv`, served from the binary cache when it is current.
+
+    Numeric columns are read-only views of memory-mapped files; copy the
+    frame before modifying it in place.
+    """
+    source = Path(data_dir) / f"{name}.csv"
+    cache_dir = Path(cache_dir) if cache_dir is not None else Path(data_dir) / ".cache"
+    meta = _current_meta(source, cache_dir)
+    if meta is None:
+        meta = _write_cache(pd.read_csv(source), source, cache_dir)
+    return _read_cache(meta, source.stem, cache_dir)
+
+
+def data_fingerprint(names, data_dir=DATA_DIR):
+    """Fingerprints of several tables, for use as a cache key by callers that memoize `load_table`."""
+    return tuple(fingerprint(Path(data_dir) / f"{name}.csv") for name in names)
+
+
+def main(argv=None):
+    names = (sys.argv[1:] if argv is None else argv) or sorted(p.stem for p in DATA_DIR.glob("*.csv"))
+    for name in names:
+        load_table(name)  # build or refresh the cache outside the timings
+        source = DATA_DIR / f"{name}.csv"
+        calls = 20
+        csv_time = timeit.timeit(lambda: pd.read_csv(source), number=calls) / calls
+        cache_time = timeit.timeit(lambda: load_table(name), number=calls) / calls
+        print(f"{name:<36} csv {csv_time * 1e3:8.2f} ms  cache {cache_time * 1e3:8.2f} ms  "
+              f"speedup {csv_time / cache_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,17 @@
 import pandas as pd
 import streamlit as st
-from pathlib import Path
 from PIL import Image
-from io import BytesIO
-import base64
 import numpy as np
-import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.graph_objects as go
-import base64
 from datetime import timedelta
 import random
+from sparklines import render_sparklines
+from stakeholder_data import data_fingerprint, load_table
+from logo_bundle import load_bundle, logo_fingerprint
 
 st.set_page_config(layout="wide")
 
-def image_to_base64(img):
-    if img:
-        with BytesIO() as buffer:
-            img.save(buffer, "png")
-            return f"data:image/png;base64,{base64.b64encode(buffer.getvalue()).decode()}"
-    return None
-
 logo_path = 'Stakeholder_logo_sm.jpg'
 logo_img = Image.open(logo_path)
 
@@ -32,58 +23,49 @@ tab1, tab2 = st.tabs(["Market", "Tokens"])
 with tab1:
     col = st.columns((2.5, 5, 2.5), gap='medium')
 
-team_df = pd.read_csv('./Stakeholder_data/teams.csv')
-price_df = pd.read_csv('./Stakeholder_data/prices.csv')
-yield_df = pd.read_csv('./Stakeholder_data/yield.csv')
-leader_df = pd.read_csv('./Stakeholder_data/leaderboard.csv')
-
-# Paths to local logos (update paths to match your actual files)
-logo_paths = [f"./images/logo_{i}.png" for i in range(0, len(team_df))]
-for path in logo_paths:
-    assert Path(path).exists(), f"Logo not found: {path}"
+TABLES = ("teams", "prices", "yield", "leaderboard")
 
-# Helper function to load and process images
-def get_image_from_disk(path_to_image):
-    return Image.open(path_to_image)
+# Shared across reruns and sessions; the fingerprint argument reloads the
+# tables when a source CSV changes.
+@st.cache_resource
+def load_tables(fingerprint):
+    return {name: load_table(name) for name in TABLES}
 
-def create_spark(team, color, days = 364, height = 50, width = 110):
-    
-    y1 = price_df[team]
-    fig = px.line(y1.iloc[-days:], facet_row_spacing=0.01, height=height, width=width)
+fingerprint = data_fingerprint(TABLES)
+tables = load_tables(fingerprint)
+team_df = tables["teams"]
+price_df = tables["prices"]
+yield_df = tables["yield"]
+leader_df = tables["leaderboard"].copy()  # modified in place below
 
-    fig.update_xaxes(visible=False, fixedrange=True)
-    fig.update_yaxes(visible=False, fixedrange=True)
+# Logo data URIs, read from the prebuilt bundle (see logo_bundle.py); the
+# per-file fingerprint argument reloads them when a logo is replaced.
+@st.cache_resource
+def load_logos(count, fingerprint):
+    return load_bundle(count)
 
-  # remove facet/subplot labels
-    fig.update_layout(annotations=[], overwrite=True)
+logo_sources = logo_fingerprint(len(team_df))
+logos = load_logos(len(team_df), logo_sources)
 
-  # strip down the rest of the plot
-    fig.update_layout(
-      showlegend=False,
-      plot_bgcolor="white",
-      margin=dict(t=10,l=10,b=10,r=10)
-    )
-    fig.update_traces(line_color=color)
-    buffer = BytesIO()
-    fig.write_image(buffer, format="png", scale=1)
-    buffer.seek(0)
-    img_base64 = base64.b64encode(buffer.getvalue()).decode()
-    return f"data:image/png;base64,{img_base64}"
-
-# Generate team dataset
+# Generate team dataset; keyed on the table and logo fingerprints, so a
+# changed CSV or logo rebuilds the rows.
 @st.cache_data
-def get_team_dataset():
+def get_team_dataset(fingerprint, logo_sources):
     teams = team_df['School']
     prices = team_df['Price']
     yields = team_df['Per Yield']
     abbreviations = team_df['Abbreviation']
     conference = team_df['Conference']
 
+    # All sparklines in one pass; unchanged ones come from the disk cache.
+    columns = teams.str.lower()
+    sparklines = render_sparklines(price_df[columns], dict(zip(columns, team_df['Color'])), days=364)
+
     data = []
     for i, team in enumerate(teams):
-        logo_base64 = image_to_base64(get_image_from_disk(logo_paths[i]))
+        logo_base64 = logos[i]
 
-        sparkline_base64 = create_spark(team.lower(), team_df['Color'].iloc[i])
+        sparkline_base64 = sparklines[team.lower()]
 
         combined_name = f"{team} [{abbreviations[i]}]"
         ytd_change = ((price_df[team.lower()].iloc[-1] - price_df[team.lower()].iloc[-364])/price_df[team.lower()].iloc[-364])*100
@@ -129,7 +111,7 @@ column_configuration = {
 
 # Load dataset
 
-main_df = get_team_dataset()
+main_df = get_team_dataset(fingerprint, logo_sources)
 main_df = main_df[["Logo", "Team", "Price", "Yield","YTD","Performance","Conference"]].sort_values(by="Price", ascending=False).reset_index(drop=True)
 main_df.index = main_df.index + 1
 
@@ -190,8 +172,6 @@ with col[1]:
     logo_path = logo_value.values[0]
 
     base64_data = logo_path.split(",")[1]
-    image_data = base64.b64decode(base64_data)
-    image = Image.open(BytesIO(image_data))
 
 
     if alt_color.lower() in ["#ffffff", "white"]: